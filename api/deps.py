@@ -1,7 +1,12 @@
 from fastapi import Request
 
+from app.admission import AdmissionController
 from app.agent import HelperAgent
 
 
 def get_helper_agent(request: Request) -> HelperAgent:
     return request.app.state.helper_agent  # type: ignore
+
+
+def get_admission(request: Request) -> AdmissionController:
+    return request.app.state.admission  # type: ignore
@@ -10,10 +10,16 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
-    thread_id: str | None = "default"
+    thread_id: str | None = None
+    mode: Literal["offline", "online"] | None = None
+
+
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest]
 
 
 class ChatResponse(BaseModel):
     answer: str
     mode: Literal["offline", "online"]
     sources: list
+    thread_id: str | None
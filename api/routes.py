@@ -1,22 +1,150 @@
+import hashlib
+import json
+import logging
+import math
 import os
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
-from api.deps import get_helper_agent
-from api.models import ChatRequest, ChatResponse
+from api.deps import get_admission, get_helper_agent
+from api.models import BatchChatRequest, ChatRequest, ChatResponse
+from app.admission import Admission, AdmissionController, Overloaded
 from app.agent import HelperAgent
 
 AGENT_MODE = os.getenv("AGENT_MODE", "local")
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _client_key(request: Request, req: ChatRequest) -> str:
+    """Who a request is rate-limited as: API key, else thread, else address."""
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    if req.thread_id:
+        return f"thread:{req.thread_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class _AdmittedStream(StreamingResponse):
+    """Streaming response that holds an admission slot until it ends.
+
+    The body releases the slot when it finishes; this also covers a client
+    that disconnects before the body starts, where the body never runs.
+    """
+
+    def __init__(self, slot: Admission, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+def _too_many_requests(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail={"reason": e.reason, "message": str(e)},
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     req: ChatRequest,
+    request: Request,
     agent: HelperAgent = Depends(get_helper_agent),
+    admission: AdmissionController = Depends(get_admission),
 ):
-    result = await agent.achat(
-        messages=[m.model_dump() for m in req.messages],
-        thread_id=req.thread_id or "default",
-    )
+    try:
+        async with admission.admit(_client_key(request, req), agent.provider):
+            result = await agent.achat(
+                messages=[m.model_dump() for m in req.messages],
+                thread_id=req.thread_id,
+                mode=req.mode,
+            )
+    except Overloaded as e:
+        raise _too_many_requests(e)
     return ChatResponse(**result)
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    req: ChatRequest,
+    request: Request,
+    agent: HelperAgent = Depends(get_helper_agent),
+    admission: AdmissionController = Depends(get_admission),
+):
+    """Server-Sent Events: `sources`, then `token`s, then `done` (or `error`).
+
+    Admission happens before the stream starts, so a shed request gets a
+    plain 429; the slot is held until the stream ends.
+    """
+    try:
+        slot = await admission.acquire(_client_key(request, req), agent.provider)
+    except Overloaded as e:
+        raise _too_many_requests(e)
+
+    async def events():
+        try:
+            async with slot:
+                async for event, data in agent.astream_chat(
+                    messages=[m.model_dump() for m in req.messages],
+                    thread_id=req.thread_id,
+                    mode=req.mode,
+                ):
+                    yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {e}")
+            yield _sse("error", {"detail": str(e)})
+
+    return _AdmittedStream(
+        slot,
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/chat/batch")
+async def chat_batch(
+    req: BatchChatRequest,
+    request: Request,
+    agent: HelperAgent = Depends(get_helper_agent),
+    admission: AdmissionController = Depends(get_admission),
+):
+    """NDJSON: one line per request as it finishes, tagged with its `index`.
+
+    Lines carry the `/chat` response fields, or `error` if that item failed.
+    A batch takes one admission slot and one client token, and is admitted
+    only if the provider quota has room for one call per item.
+    """
+    requests = [
+        {
+            "messages": [m.model_dump() for m in item.messages],
+            "thread_id": item.thread_id,
+            "mode": item.mode,
+        }
+        for item in req.requests
+    ]
+
+    client = _client_key(request, req.requests[0]) if req.requests else "batch"
+    try:
+        slot = await admission.acquire(client, agent.provider, len(requests))
+    except Overloaded as e:
+        raise _too_many_requests(e)
+
+    async def lines():
+        async with slot:
+            async for index, result in agent.abatch_chat(requests):
+                yield json.dumps({"index": index, **result}) + "\n"
+
+    return _AdmittedStream(slot, lines(), media_type="application/x-ndjson")
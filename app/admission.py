@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+)
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_CLIENTS = 10_000
+SERVICE_TIME_DECAY = 0.2
+
+
+class Overloaded(Exception):
+    """A request was shed instead of queued; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server overloaded ({reason}), retry in {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = max(retry_after, 1.0)
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    """Whether an LLM client error is the provider's rate limit or quota."""
+    for candidate in (error, getattr(error, "__cause__", None)):
+        if candidate is None:
+            continue
+        status = getattr(candidate, "status_code", None) or getattr(
+            getattr(candidate, "response", None), "status_code", None
+        )
+        if status == 429:
+            return True
+        if type(candidate).__name__ in ("RateLimitError", "ResourceExhausted"):
+            return True
+    return "RESOURCE_EXHAUSTED" in str(error)
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token: 0 if granted, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class QuotaTracker:
+    """Our own per-worker count of LLM provider calls against per-minute/day limits."""
+
+    def __init__(
+        self, per_minute: Dict[str, int], per_day: Dict[str, int], cooldown: float
+    ):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.cooldown = cooldown
+        self._minute: Dict[str, Deque[float]] = {}
+        self._day: Dict[str, Tuple[Any, int]] = {}
+        self._blocked_until: Dict[str, float] = {}
+
+    @classmethod
+    def from_settings(cls) -> "QuotaTracker":
+        return cls(
+            settings.LLM_QUOTA_RPM,
+            settings.LLM_QUOTA_RPD,
+            settings.LLM_RATE_LIMIT_COOLDOWN,
+        )
+
+    def _window(self, provider: str, now: float) -> Deque[float]:
+        window = self._minute.setdefault(provider, deque())
+        while window and window[0] <= now - 60:
+            window.popleft()
+        return window
+
+    def _today(self, provider: str) -> Tuple[Any, int]:
+        today = datetime.now(timezone.utc).date()
+        day, used = self._day.get(provider, (today, 0))
+        return (day, used) if day == today else (today, 0)
+
+    def wait(self, provider: str, count: int = 1) -> float:
+        """Whether `count` more calls fit: 0 if so, else seconds to wait."""
+        now = time.monotonic()
+        blocked = self._blocked_until.get(provider, 0.0) - now
+        if blocked > 0:
+            return blocked
+
+        window = self._window(provider, now)
+        per_minute = self.per_minute.get(provider, 0)
+        if per_minute and len(window) + count > per_minute:
+            return window[0] + 60 - now if window else 60.0
+
+        day, used = self._today(provider)
+        per_day = self.per_day.get(provider, 0)
+        if per_day and used + count > per_day:
+            midnight = datetime.combine(
+                day + timedelta(days=1), datetime.min.time(), timezone.utc
+            )
+            return (midnight - datetime.now(timezone.utc)).total_seconds()
+        return 0.0
+
+    def charge(self, provider: str, count: int = 1):
+        """Count `count` calls actually sent to `provider`."""
+        now = time.monotonic()
+        self._window(provider, now).extend([now] * count)
+        day, used = self._today(provider)
+        self._day[provider] = (day, used + count)
+
+    def penalize(self, provider: str):
+        """Stop admitting requests for `provider` after it rate-limited us."""
+        logger.warning(f"{provider} rate limit hit, shedding for {self.cooldown}s")
+        self._blocked_until[provider] = time.monotonic() + self.cooldown
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        return {
+            provider: {
+                "last_minute": len(self._minute.get(provider, ())),
+                "today": self._day.get(provider, (None, 0))[1],
+            }
+            for provider in set(self._minute) | set(self._day)
+        }
+
+
+class QuotaCallback(BaseCallbackHandler):
+    """Charges `quota` for every call a chat model makes to `provider`."""
+
+    run_inline = True
+
+    def __init__(self, quota: QuotaTracker, provider: str):
+        self.quota = quota
+        self.provider = provider
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.quota.charge(self.provider)
+
+
+class AdmissionController:
+    """Sheds chat requests up front (client rate, quota, queue) or waits for a slot."""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        client_rate: float,
+        client_burst: int,
+        quota: QuotaTracker,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.quota = quota
+        self.waiting = 0
+        self.running = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._service_time: Optional[float] = None
+
+    @classmethod
+    def from_settings(
+        cls, quota: Optional[QuotaTracker] = None
+    ) -> "AdmissionController":
+        return cls(
+            max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            client_rate=settings.CLIENT_RATE_PER_MINUTE / 60,
+            client_burst=settings.CLIENT_BURST,
+            quota=quota or QuotaTracker.from_settings(),
+        )
+
+    def _reject(self, reason: str, retry_after: float):
+        ADMISSION_REJECTED.labels(reason).inc()
+        raise Overloaded(reason, retry_after)
+
+    def _check_client(self, client: str):
+        if self.client_rate <= 0:
+            return
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(
+                self.client_rate, self.client_burst
+            )
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(client)
+        wait = bucket.take()
+        if wait:
+            self._reject("client_rate", wait)
+
+    def _expected_wait(self) -> float:
+        if self._service_time is None or self.running < self.max_concurrent:
+            return 0.0
+        return (self.waiting + 1) * self._service_time / self.max_concurrent
+
+    async def acquire(self, client: str, provider: str, cost: int = 1) -> "Admission":
+        """Admit a request (expected to need `cost` provider calls) or raise."""
+        self._check_client(client)
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self._reject("queue_full", self._expected_wait() or self.queue_timeout)
+        expected = self._expected_wait()
+        if expected > self.queue_timeout:
+            self._reject("queue_timeout", expected)
+        wait = self.quota.wait(provider, cost)
+        if wait:
+            self._reject("provider_quota", wait)
+
+        if self._slots.locked():
+            await self._wait_for_slot()
+        else:
+            await self._slots.acquire()
+            ADMISSION_WAIT_SECONDS.observe(0.0)
+        self.running += 1
+        ADMISSION_IN_FLIGHT.inc()
+        return Admission(self, provider)
+
+    async def _wait_for_slot(self):
+        started = time.monotonic()
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.inc()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout", self._expected_wait() or self.queue_timeout)
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.dec()
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started)
+
+    def _release(self, held: float):
+        self.running -= 1
+        ADMISSION_IN_FLIGHT.dec()
+        self._slots.release()
+        if self._service_time is None:
+            self._service_time = held
+        else:
+            self._service_time += SERVICE_TIME_DECAY * (held - self._service_time)
+
+    @asynccontextmanager
+    async def admit(
+        self, client: str, provider: str, cost: int = 1
+    ) -> AsyncIterator[None]:
+        async with await self.acquire(client, provider, cost):
+            yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "service_time_s": round(self._service_time or 0.0, 3),
+            "quota": self.quota.usage(),
+        }
+
+
+class Admission:
+    """A held slot; releases it on exit and maps provider 429s to `Overloaded`."""
+
+    def __init__(self, controller: AdmissionController, provider: str):
+        self._controller = controller
+        self._provider = provider
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        """Give the slot back; later calls are no-ops."""
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(time.monotonic() - self._started)
+
+    async def __aenter__(self) -> "Admission":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.release()
+        if exc is not None and not isinstance(exc, Overloaded) and is_rate_limit(exc):
+            quota = self._controller.quota
+            quota.penalize(self._provider)
+            ADMISSION_REJECTED.labels("provider_rate_limit").inc()
+            raise Overloaded("provider_rate_limit", quota.cooldown) from exc
+        return False
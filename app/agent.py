@@ -1,22 +1,52 @@
 import asyncio
 import logging
 import os
-from pathlib import Path
-from typing import Any, Dict, List, Literal
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional, Tuple
 
 from dotenv import load_dotenv
-from langchain.agents import create_agent
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+)
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, START, StateGraph
-from langgraph.graph.message import add_messages
+from langgraph.graph.message import REMOVE_ALL_MESSAGES, add_messages
 from typing_extensions import Annotated, TypedDict
 
-from app.tools import get_online_tools
-from app.utils import build_vectorstore
+from app.cache import AnswerCache
+from app.concurrency import provider_limit, run_blocking
+from app.context import build_context
+from app.index_store import index_exists
+from app.memory import history_removals
+from app.metrics import (
+    CACHE_LOOKUPS,
+    CONTEXT_TOKENS,
+    OUT_OF_SCOPE,
+    RETRIEVED_CHUNKS,
+    RequestTrace,
+    get_trace,
+    timed,
+)
+from app.rerank import OUT_OF_SCOPE_ANSWER, rerank
+from app.resources import (
+    query_embedder,
+    shared_checkpointer,
+    shared_embeddings,
+    shared_llm,
+    shared_query_embedder,
+    shared_reranker,
+    shared_retriever,
+)
+from app.retrieval import IndexRetriever, batch_search_shards, search_shards
+from app.startup import StartupProfile
 from config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +62,9 @@ DATA_PATHS = [
     "data/langchain-llms.txt",
     "data/langchain-llms-full.txt",
 ]
+ANSWER_NODES = ("offline_rag", "online_search")
+WARMUP_BACKOFF_SECONDS = 1.0
+WARMUP_MAX_BACKOFF_SECONDS = 60.0
 
 
 class AgentState(TypedDict):
@@ -43,62 +76,259 @@ class AgentState(TypedDict):
 class HelperAgent:
     """Wrapper around LLM + LangGraph workflow."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        llm: Optional[Any] = None,
+        embeddings: Optional[Any] = None,
+        mode: Optional[Literal["offline", "online"]] = None,
+        checkpointer: Optional[Any] = None,
+        reranker: Optional[Any] = None,
+    ):
         logger.info("Initializing agent")
-        self.mode: Literal["offline", "online"] = os.getenv("AGENT_MODE", "offline")
-        self.llm = self._build_llm()
+        self.mode: Literal["offline", "online"] = mode or os.getenv(
+            "AGENT_MODE", "offline"
+        )
+        self.provider = settings.LLM_PROVIDER
+        self._llm = llm
+        self._embeddings = embeddings
+        self._query_embedder = None
+        if embeddings is not None:
+            self._query_embedder = query_embedder(embeddings)
+        self._reranker = reranker
         if self.mode == "offline":
-            vs_path = Path("vectorstore/chroma")
-            if not vs_path.exists() or not any(vs_path.iterdir()):
+            if not index_exists():
                 raise RuntimeError(
                     "Offline mode requires a built vectorstore. "
                     "Run `python scripts/ingest_docs.py` first."
                 )
 
-        self._setup_retriever()
+        self.answer_cache = AnswerCache(
+            maxsize=settings.ANSWER_CACHE_SIZE,
+            ttl=settings.ANSWER_CACHE_TTL,
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+        )
+        self._retriever: Optional[IndexRetriever] = None
+        self._retriever_lock = threading.Lock()
+        self._index_checked = 0.0
         self.tools = []
-        self.graph = self._build_graph()
-
-    def _build_llm(self) -> Any:
-        """Create an LLM client based on env vars."""
-        provider = settings.LLM_PROVIDER
-        model = settings.MODEL_NAME
-
-        if provider == "gemini":
-            return ChatGoogleGenerativeAI(
-                model=model,
-                api_key=settings.GOOGLE_API_KEY,
-                temperature=0.2,
-            )
-        elif provider == "openrouter":
-            return ChatOpenAI(
-                model=settings.OPENROUTER_MODEL_NAME,
-                api_key=settings.OPENROUTER_API_KEY,
-                base_url="https://openrouter.ai/api/v1",
-                temperature=0.2,
-            )
+        self._online_agent = None
+        self.checkpointer = checkpointer or shared_checkpointer()
+        self.graph = self._build_graph(self.checkpointer)
+        # Requests without a thread are answered from their messages alone
+        self._stateless_graph = self._build_graph(None)
+
+    @property
+    def llm(self) -> Any:
+        """LLM client; the process-wide one unless injected."""
+        return self._llm or shared_llm(self.provider)
+
+    @property
+    def embeddings(self) -> Any:
+        """Embedding model; the process-wide one unless injected."""
+        if self._embeddings is None:
+            return shared_embeddings()
+        return self._embeddings
+
+    @property
+    def query_embedder(self) -> Any:
+        """Batching, caching question embedder over `embeddings`."""
+        return self._query_embedder or shared_query_embedder()
+
+    @property
+    def reranker(self) -> Any:
+        """Reranking cross-encoder; the process-wide one unless injected."""
+        return self._reranker or shared_reranker()
+
+    def _get_retriever(self) -> IndexRetriever:
+        """Index retriever, opened on the first offline request.
+
+        Agents built with injected embeddings get their own; otherwise the
+        process-wide one is shared, so online-only use never loads the
+        embedding model.
+        """
+        if self._retriever is not None:
+            return self._retriever
+        with self._retriever_lock:
+            if self._retriever is None:
+                if not index_exists():
+                    raise RuntimeError(
+                        "Offline mode requires a built vectorstore. "
+                        "Run `python scripts/ingest_docs.py` first."
+                    )
+                logger.info("Setting up retriever")
+                if self._embeddings is None:
+                    retriever = shared_retriever()
+                else:
+                    retriever = IndexRetriever(self._query_embedder)
+                self.answer_cache.use_version(retriever.version)
+                self._retriever = retriever
+        return self._retriever
+
+    def reload_retriever(self) -> bool:
+        """Serve the published index version if it changed.
+
+        Cached answers are dropped whenever the served version moves on.
+        """
+        if self._retriever is None:
+            return False
+        changed = self._retriever.reload()
+        self.answer_cache.use_version(self._retriever.version)
+        return changed
+
+    def _check_index(self):
+        """`reload_retriever`, at most once per `INDEX_POLL_SECONDS`.
+
+        The API's `DataRefresher` already reloads on publish; this covers
+        processes without one (Streamlit) without a file read per request.
+        """
+        now = time.monotonic()
+        if now - self._index_checked < settings.INDEX_POLL_SECONDS:
+            return
+        self._index_checked = now
+        self.reload_retriever()
+
+    def warm_up(
+        self,
+        profile: StartupProfile,
+        stop: Optional[threading.Event] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        """Load everything the default mode needs before the first request.
+
+        Each step is a phase of `profile`. A failed step is retried with
+        exponential backoff (up to `max_attempts` times, forever if None),
+        so a process that could not warm up yet, e.g. before its first
+        index is published, becomes ready once it can. Setting `stop`
+        abandons the warmup.
+        """
+        stop = stop or threading.Event()
+        steps = [("llm", lambda: self.llm)]
+        if self.mode == "offline":
+            steps = [
+                ("embeddings", lambda: self.embeddings.embed_query("LangGraph")),
+                ("retriever", self._get_retriever),
+            ] + steps
+            if settings.RERANK_ENABLED:
+                steps.append(("reranker", lambda: self.reranker))
         else:
-            raise ValueError(f"Unsupported LLM_PROVIDER={provider}")
-
-    def _setup_retriever(self):
-        """Build Chroma vectorstore from docs."""
-        logger.info("Setting up retriever")
-        vectorstore = build_vectorstore()
-        self._offline_retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-        logger.info("Successfully built VS as retriever")
+            steps.append(("online_agent", self._get_online_agent))
+        for name, step in steps:
+            attempt = 1
+            while True:
+                try:
+                    with profile.phase(f"warmup:{name}"):
+                        step()
+                    break
+                except Exception:
+                    if max_attempts is not None and attempt >= max_attempts:
+                        profile.finish()
+                        return
+                delay = min(
+                    WARMUP_BACKOFF_SECONDS * 2 ** (attempt - 1),
+                    WARMUP_MAX_BACKOFF_SECONDS,
+                )
+                logger.info(f"Retrying warmup:{name} in {delay:.0f}s")
+                if stop.wait(delay):
+                    return
+                attempt += 1
+        profile.finish()
+
+    def _trim_history(self, state: AgentState, config: RunnableConfig):
+        """Drop the oldest turns of the thread beyond the history token budget."""
+        with get_trace(config).span("trim_history"):
+            removals = history_removals(
+                state["messages"], settings.HISTORY_TOKEN_BUDGET
+            )
+        if removals:
+            logger.info(f"Trimmed {len(removals)} messages from thread history")
+            return {"messages": removals}
+        return {}
 
-    def _router(self, state: AgentState):
-        return {"branch": state["mode"]}
+    def _router(self, state: AgentState, config: RunnableConfig):
+        with get_trace(config).span("router"):
+            return {"branch": state["mode"]}
 
-    def _offline_rag_node(self, state: AgentState):
+    async def _offline_rag_node(self, state: AgentState, config: RunnableConfig):
         question = state["messages"][-1].content
-        logger.info(f"Invoked offline RAG node with question: {question}")
-        docs = self._offline_retriever.invoke(question)
-
-        context = "\n\n".join(d.page_content for d in docs[:6])
-        logger.info(
-            f"Retrieved context: {context[:30] if len(context)>30 else context}...\n Full length: {len(context)}"
+        if settings.LOG_PAYLOADS:
+            logger.info(f"Invoked offline RAG node with question: {question}")
+        trace = get_trace(config)
+        retriever = await run_blocking(self._get_retriever)
+        await run_blocking(self._check_index)
+        prefetched = config["configurable"].get("prefetched")
+        if prefetched:
+            embedding = prefetched["embedding"]
+        else:
+            with trace.span("embed"):
+                embedder = await run_blocking(lambda: self.query_embedder)
+                embedding = await embedder.aembed_query(question)
+
+        cached = self.answer_cache.lookup(question, embedding)
+        if self.answer_cache.enabled:
+            CACHE_LOOKUPS.labels("answer", "hit" if cached else "miss").inc()
+        if cached:
+            entry, match, similarity = cached
+            logger.info(f"Answer cache hit ({match}, similarity={similarity:.3f})")
+            sources = [
+                {**source, "cached": True, "cache_match": match}
+                for source in entry["sources"]
+            ]
+            get_stream_writer()({"sources": sources})
+            return {
+                "messages": [AIMessage(content=entry["answer"])],
+                "docs": sources,
+            }
+
+        if prefetched:
+            docs, version = prefetched["docs"], prefetched["version"]
+        else:
+            with retriever.lease() as handle, trace.span("retrieval"):
+                version = handle.version
+                shards = handle.route(question)
+                trace.note(shards=[shard.name for shard in shards])
+                docs = await search_shards(
+                    shards,
+                    question,
+                    embedding,
+                    k=_candidate_count(),
+                    budget=settings.RETRIEVAL_BUDGET_MS / 1000,
+                    hybrid=settings.HYBRID_RETRIEVAL,
+                )
+        sources = [d.metadata for d in docs]
+        if settings.RERANK_ENABLED and docs:
+            with trace.span("rerank"):
+                scored = await run_blocking(
+                    rerank,
+                    self.reranker,
+                    question,
+                    docs,
+                    settings.RETRIEVAL_K,
+                    settings.RERANK_MIN_SCORE,
+                )
+            trace.note(rerank={"candidates": len(docs), "kept": len(scored)})
+            docs = [doc for doc, _ in scored]
+            sources = [
+                {**doc.metadata, "rerank_score": round(score, 4)}
+                for doc, score in scored
+            ]
+        if not docs:
+            OUT_OF_SCOPE.inc()
+            logger.info("No relevant chunks retrieved, answering out of scope")
+            get_stream_writer()({"sources": []})
+            return {"messages": [AIMessage(content=OUT_OF_SCOPE_ANSWER)], "docs": []}
+        get_stream_writer()(
+            {"sources": [{**source, "cached": False} for source in sources]}
         )
+
+        with trace.span("context"):
+            context, context_stats = build_context(docs, settings.CONTEXT_TOKEN_BUDGET)
+        RETRIEVED_CHUNKS.observe(len(docs))
+        CONTEXT_TOKENS.observe(context_stats["context_tokens"])
+        if settings.LOG_PAYLOADS:
+            logger.info(
+                f"Retrieved context: {context[:30] if len(context)>30 else context}...\n Full length: {len(context)}"
+            )
+        logger.info(f"Context packing: {context_stats}")
         prompt = ChatPromptTemplate.from_template(
             "You are a LangGraph/LangChain helper.\n"
             "Use ONLY the provided documentation.\n\n"
@@ -107,54 +337,76 @@ class HelperAgent:
             "Answer:"
         )
         chain = prompt | self.llm | StrOutputParser()
-        answer = chain.invoke({"context": context, "question": question})
+        async with provider_limit(self.provider):
+            answer = await chain.ainvoke({"context": context, "question": question})
 
+        self.answer_cache.store(question, embedding, answer, sources, version)
         return {
             "messages": [AIMessage(content=answer)],
-            "docs": [d.metadata for d in docs],
+            "docs": [{**source, "cached": False} for source in sources],
         }
 
-    def _online_node(self, state: AgentState):
-        logger.info(f"Invoked online node: {state['messages'][-1].content}")
+    def _get_online_agent(self) -> Optional[Any]:
+        """Tool-calling agent, compiled on first use and reused afterwards."""
+        if self._online_agent is not None:
+            return self._online_agent
+
+        from langchain.agents import create_agent
+
+        from app.tools import get_online_tools
+
         try:
             self.tools = get_online_tools()
             logger.info(f"Loaded {len(self.tools)} online tools")
         except (ImportError, Exception) as e:
             logger.warning(f"No tools available: {e}")
             self.tools = []
+            return None
 
-        if not self.tools:
+        system_prompt = """You are a LangGraph/LangChain expert. 
+        Use search tools for latest information. Provide code examples."""
+        logger.info("Creating agent with tools")
+        self._online_agent = create_agent(
+            self.llm, self.tools, system_prompt=system_prompt
+        )
+        return self._online_agent
+
+    async def _online_node(self, state: AgentState):
+        if settings.LOG_PAYLOADS:
+            logger.info(f"Invoked online node: {state['messages'][-1].content}")
+        sources = [{"tool": "search", "query": state["messages"][-1].content}]
+        get_stream_writer()({"sources": sources})
+        agent = self._get_online_agent()
+
+        if agent is None:
             logger.info(f"No tools found, loading simple LLM")
             question = state["messages"][-1].content
             prompt = ChatPromptTemplate.from_template(
                 "You are a LangGraph/LangChain expert. Answer: {question}"
             )
             chain = prompt | self.llm | StrOutputParser()
-            answer = chain.invoke({"question": question})
-            logger.info(f"Simple LLM answer: {answer}")
-            return {"messages": [AIMessage(content=answer)], "docs": []}
-
-        system_prompt = """You are a LangGraph/LangChain expert. 
-        Use search tools for latest information. Provide code examples."""
-        logger.info("Creating agent with tools")
+            async with provider_limit(self.provider):
+                answer = await chain.ainvoke({"question": question})
+            if settings.LOG_PAYLOADS:
+                logger.info(f"Simple LLM answer: {answer}")
+            return {"messages": [AIMessage(content=answer)], "docs": sources}
 
-        agent = create_agent(self.llm, self.tools, system_prompt=system_prompt)
+        async with provider_limit(self.provider):
+            result = await agent.ainvoke({"messages": state["messages"]})
+        if settings.LOG_PAYLOADS:
+            logger.info(f"Agent with tools answer: {result['messages']}")
 
-        result = agent.invoke({"messages": state["messages"]})
-        logger.info(f"Agent with tools answer: {result['messages']}")
+        return {"messages": result["messages"], "docs": sources}
 
-        return {
-            "messages": result["messages"],
-            "docs": [{"tool": "search", "query": state["messages"][-1].content}],
-        }
-
-    def _build_graph(self):
+    def _build_graph(self, checkpointer: Optional[Any]):
         workflow = StateGraph(AgentState)
         workflow.add_node("offline_rag", self._offline_rag_node)
         workflow.add_node("online_search", self._online_node)
+        workflow.add_node("trim_history", self._trim_history)
         workflow.add_node("router", self._router)
 
-        workflow.add_edge(START, "router")
+        workflow.add_edge(START, "trim_history")
+        workflow.add_edge("trim_history", "router")
         workflow.add_conditional_edges(
             "router",
             lambda s: s["branch"],
@@ -166,37 +418,283 @@ class HelperAgent:
         workflow.add_edge("offline_rag", END)
         workflow.add_edge("online_search", END)
 
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
 
-    async def achat(self, messages: List[Dict[str, str]], thread_id: str = "default"):
-        """Async chat entry – used by FastAPI."""
+    def _initial_state(
+        self, messages: List[Dict[str, str]], mode: Optional[str] = None
+    ) -> Dict[str, Any]:
         lc_messages: List[BaseMessage] = []
         for m in messages:
             if m["role"] == "user":
                 lc_messages.append(HumanMessage(content=m["content"]))
             else:
                 lc_messages.append(AIMessage(content=m["content"]))
+        if len(lc_messages) > 1:
+            # A full history replaces the stored thread rather than extending it
+            lc_messages.insert(0, RemoveMessage(id=REMOVE_ALL_MESSAGES))
 
-        state = {
+        return {
             "messages": lc_messages,
-            "mode": self.mode,
+            "mode": mode or self.mode,
             "docs": [],
         }
 
-        config = {"configurable": {"thread_id": thread_id}}
-        result = await self.graph.ainvoke(state, config=config)
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        thread_id: Optional[str] = "default",
+        mode: Optional[str] = None,
+        prefetched: Optional[Dict[str, Any]] = None,
+    ):
+        """Async chat entry – used by FastAPI. `mode` overrides the default.
+
+        The thread's earlier turns come from the checkpointer, so callers
+        only need to send the newest message. Sending several messages
+        replaces the stored history with them; with no `thread_id` nothing
+        is stored. `prefetched` carries the question embedding and docs
+        when retrieval already ran in bulk.
+        """
+        state = self._initial_state(messages, mode)
+        trace = RequestTrace()
+        config = self._run_config(thread_id, trace, prefetched=prefetched)
+        try:
+            result = await self._graph(thread_id).ainvoke(state, config=config)
+        except Exception:
+            trace.finish(state["mode"], "error", thread_id=thread_id)
+            raise
+        trace.finish(state["mode"], thread_id=thread_id, sources=len(result["docs"]))
         answer_msg: BaseMessage = result["messages"][-1]
-        logger.info(f"Succesfully got answer: {answer_msg}")
+        if settings.LOG_PAYLOADS:
+            logger.info(f"Succesfully got answer: {answer_msg}")
         return {
             "answer": answer_msg.content,
-            "mode": self.mode,
+            "mode": state["mode"],
+            "sources": result.get("docs", []),
+            "thread_id": thread_id,
+        }
+
+    def _graph(self, thread_id: Optional[str]) -> Any:
+        return self.graph if thread_id else self._stateless_graph
+
+    @staticmethod
+    def _run_config(
+        thread_id: Optional[str], trace: RequestTrace, **configurable: Any
+    ) -> Dict[str, Any]:
+        return {
+            "configurable": {"thread_id": thread_id, "trace": trace, **configurable},
+            "callbacks": [trace],
+        }
+
+    async def _prefetch_batch(
+        self, requests: List[Dict[str, Any]]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Embed and retrieve for all offline requests of a batch at once."""
+        offline = [
+            i
+            for i, request in enumerate(requests)
+            if (request.get("mode") or self.mode) == "offline" and request["messages"]
+        ]
+        if not offline:
+            return {}
+        questions = [requests[i]["messages"][-1]["content"] for i in offline]
+        try:
+            retriever = await run_blocking(self._get_retriever)
+            await run_blocking(self._check_index)
+            with timed("batch_embed"):
+                embeddings = await run_blocking(
+                    lambda: self.embeddings.embed_documents(questions)
+                )
+            with retriever.lease() as handle, timed("batch_retrieval"):
+                version = handle.version
+                docs = await run_blocking(
+                    batch_search_shards,
+                    [handle.route(question) for question in questions],
+                    questions,
+                    embeddings,
+                    _candidate_count(),
+                    settings.HYBRID_RETRIEVAL,
+                )
+        except Exception as e:
+            logger.warning(f"Batch retrieval failed, retrieving per item: {e}")
+            return {}
+        logger.info(f"Retrieved for {len(offline)} batch questions in bulk")
+        return {
+            i: {"embedding": embedding, "docs": item_docs, "version": version}
+            for i, embedding, item_docs in zip(offline, embeddings, docs)
+        }
+
+    async def abatch_chat(
+        self, requests: List[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Answer many chats, yielding `(index, result)` as each one finishes.
+
+        Each request holds `messages` and optionally `thread_id` and `mode`.
+        Offline questions are embedded in one call and retrieved with one
+        bulk query per shard up front, then the LLM calls fan out with at
+        most `BATCH_CONCURRENCY` in flight. A failing item yields
+        `{"error": ...}` and does not affect the others.
+        """
+        prefetched = await self._prefetch_batch(requests)
+        semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+        async def one(i: int, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+            thread_id = request.get("thread_id")
+            async with semaphore:
+                try:
+                    result = await self.achat(
+                        request["messages"],
+                        thread_id,
+                        request.get("mode"),
+                        prefetched=prefetched.get(i),
+                    )
+                except Exception as e:
+                    logger.error(f"Batch item {i} failed: {e}")
+                    result = {"error": str(e), "thread_id": thread_id}
+            return i, result
+
+        tasks = [asyncio.create_task(one(i, r)) for i, r in enumerate(requests)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        thread_id: Optional[str] = "default",
+        mode: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream a chat as `(event, data)` pairs.
+
+        Emits `sources` once retrieval is done, then `token` for each piece
+        of the answer as the LLM generates it, and finally `done` with the
+        same payload `achat` returns. Cached answers arrive as one token.
+        """
+        state = self._initial_state(messages, mode)
+        trace = RequestTrace()
+        config = self._run_config(thread_id, trace)
+        streamed = False
+        held: Dict[Optional[str], List[str]] = {}
+        result: Dict[str, Any] = {}
+        status = "error"
+        try:
+            # Subgraphs too: the online answer comes from the tool-calling
+            # agent's `model` node, nested under `online_search`
+            async for namespace, stream, data in self._graph(thread_id).astream(
+                state,
+                config=config,
+                stream_mode=["custom", "messages", "updates", "values"],
+                subgraphs=True,
+            ):
+                if stream == "custom" and "sources" in data:
+                    yield "sources", data["sources"]
+                elif stream == "messages":
+                    chunk, metadata = data
+                    text = _chunk_text(chunk)
+                    if (
+                        not text
+                        or _top_level_node(namespace, metadata) not in ANSWER_NODES
+                    ):
+                        continue
+                    if namespace:
+                        # An agent message may still end in a tool call, so
+                        # its text waits until the model step is complete
+                        held.setdefault(chunk.id, []).append(text)
+                    else:
+                        streamed = True
+                        yield "token", text
+                elif stream == "updates" and namespace:
+                    for message in _updated_messages(data):
+                        texts = held.pop(message.id, [])
+                        if isinstance(message, AIMessage) and not message.tool_calls:
+                            for text in texts:
+                                streamed = True
+                                yield "token", text
+                elif stream == "values" and not namespace:
+                    result = data
+            status = "ok"
+        finally:
+            trace.finish(state["mode"], status, thread_id=thread_id, streamed=True)
+
+        answer = result["messages"][-1].content
+        if not streamed:
+            yield "token", answer
+        yield "done", {
+            "answer": answer,
+            "mode": state["mode"],
             "sources": result.get("docs", []),
+            "thread_id": thread_id,
         }
 
-    def chat(self, messages: List[Dict[str, str]], thread_id: str = "default") -> dict:
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        thread_id: str = "default",
+        mode: Optional[str] = None,
+    ) -> dict:
         """Sync wrapper for Streamlit."""
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(self.achat(messages, thread_id))
+        result = loop.run_until_complete(self.achat(messages, thread_id, mode))
         loop.close()
         return result
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        thread_id: str = "default",
+        mode: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """Sync wrapper around `astream_chat` for Streamlit."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        events = self.astream_chat(messages, thread_id, mode)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(events.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(events.aclose())
+            loop.close()
+
+
+def _candidate_count() -> int:
+    """Chunks to retrieve: over-fetched when a reranker picks the final ones."""
+    if settings.RERANK_ENABLED:
+        return max(settings.RERANK_CANDIDATES, settings.RETRIEVAL_K)
+    return settings.RETRIEVAL_K
+
+
+def _top_level_node(namespace: Tuple[str, ...], metadata: Dict[str, Any]) -> str:
+    """Node of the outer graph a streamed message came from."""
+    if namespace:
+        return namespace[0].split(":")[0]
+    return metadata.get("langgraph_node", "")
+
+
+def _updated_messages(updates: Dict[str, Any]) -> List[BaseMessage]:
+    """Messages a subgraph step wrote, from a `updates` stream item."""
+    messages: List[BaseMessage] = []
+    for update in updates.values():
+        if isinstance(update, dict):
+            written = update.get("messages", [])
+            messages.extend(written if isinstance(written, list) else [written])
+    return messages
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of a streamed message chunk (content may be a list of parts)."""
+    if not isinstance(chunk, AIMessageChunk):
+        return ""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in content
+        if isinstance(part, str) or part.get("type") == "text"
+    )
@@ -0,0 +1,156 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form used for exact cache matches."""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after insert."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Live entries, least recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, v) for k, (exp, v) in self._data.items() if exp >= now]
+
+    def touch(self, key: Any):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AnswerCache:
+    """Cached answers, matched by normalized question or by embedding similarity.
+
+    A lookup first tries the exact normalized question, then the cached
+    question whose embedding has the highest cosine similarity to the
+    query, provided it reaches `threshold`. Answers belong to the index
+    `version` they were retrieved from: moving to another version clears
+    the cache, and answers from any other version are not stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        self.threshold = threshold
+        self.version: Optional[str] = None
+        self._entries = TTLCache(maxsize, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._entries.maxsize > 0
+
+    def lookup(
+        self, question: str, embedding: List[float]
+    ) -> Optional[Tuple[Dict[str, Any], str, float]]:
+        """Return `(entry, match, similarity)` for a cached answer, if any."""
+        if not self.enabled:
+            return None
+
+        key = normalize_question(question)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry, "exact", 1.0
+
+        items = self._entries.items()
+        if items:
+            matrix = np.stack([e["embedding"] for _, e in items])
+            scores = matrix @ self._unit(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                best_key, entry = items[best]
+                self._entries.touch(best_key)
+                self.hits += 1
+                return entry, "semantic", float(scores[best])
+
+        self.misses += 1
+        return None
+
+    def store(
+        self,
+        question: str,
+        embedding: List[float],
+        answer: str,
+        sources: List[Dict[str, Any]],
+        version: Optional[str] = None,
+    ):
+        if not self.enabled:
+            return
+        if version != self.version:
+            logger.info(f"Not caching an answer from index version {version}")
+            return
+        self._entries.set(
+            normalize_question(question),
+            {
+                "embedding": self._unit(embedding),
+                "answer": answer,
+                "sources": sources,
+            },
+        )
+
+    def use_version(self, version: Optional[str]):
+        """Serve answers for index `version`, dropping those of another one."""
+        if version != self.version:
+            self.version = version
+            self.clear()
+
+    def clear(self):
+        if len(self._entries):
+            logger.info(f"Clearing {len(self._entries)} cached answers")
+        self._entries.clear()
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
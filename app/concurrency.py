@@ -0,0 +1,40 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+
+from config import settings
+
+DEFAULT_LLM_CONCURRENCY = 32
+
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.RETRIEVAL_WORKERS, thread_name_prefix="retrieval"
+)
+_limits: WeakKeyDictionary = WeakKeyDictionary()
+
+
+async def run_blocking(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run CPU/IO-bound sync work (embedding, Chroma) on the bounded pool.
+
+    Keeps blocking calls off the event loop without letting them take
+    over the default executor shared with the rest of the app.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _blocking_executor, partial(func, *args, **kwargs)
+    )
+
+
+def provider_limit(provider: str) -> asyncio.Semaphore:
+    """Semaphore bounding in-flight calls to an LLM provider.
+
+    Sizes come from `LLM_MAX_CONCURRENCY`. Semaphores are per event loop,
+    so the limit applies per uvicorn worker (or Streamlit session loop).
+    """
+    loop = asyncio.get_running_loop()
+    per_loop = _limits.setdefault(loop, {})
+    if provider not in per_loop:
+        size = settings.LLM_MAX_CONCURRENCY.get(provider, DEFAULT_LLM_CONCURRENCY)
+        per_loop[provider] = asyncio.Semaphore(size)
+    return per_loop[provider]
@@ -0,0 +1,147 @@
+import logging
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+from langchain_core.documents import Document
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+SHINGLE_SIZE = 5
+DUPLICATE_JACCARD = 0.8
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token for English + code)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {
+        tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _overlap_matches(block: Dict[str, Any], start: int, doc: Document) -> bool:
+    """Whether the bytes `doc` shares with `block` are the same text in both."""
+    text = block["text"].encode("utf-8")
+    content = doc.page_content.encode("utf-8")
+    block_start = block["end"] - len(text)
+    if start < block_start:
+        return False
+    shared = text[start - block_start : start - block_start + len(content)]
+    return content.startswith(shared)
+
+
+def _merge_overlapping(docs: List[Document]) -> Tuple[List[Dict[str, Any]], int]:
+    """Join chunks from the same source whose byte ranges overlap or touch.
+
+    Chunks with a gap between them, or whose shared bytes differ (offsets
+    from an outdated index), stay separate blocks so the source is never
+    spliced.
+    Returns blocks in the order of their best-ranked chunk, and how many
+    chunks were folded into another one.
+    """
+    blocks: List[Dict[str, Any]] = []
+    by_source: Dict[str, List[Tuple[int, Document]]] = {}
+    for rank, doc in enumerate(docs):
+        meta = doc.metadata
+        if "start_byte" not in meta or "end_byte" not in meta:
+            blocks.append({"rank": rank, "text": doc.page_content, "meta": meta})
+            continue
+        by_source.setdefault(meta.get("source", ""), []).append((rank, doc))
+
+    merged = 0
+    for chunks in by_source.values():
+        chunks.sort(key=lambda item: item[1].metadata["start_byte"])
+        current = None
+        for rank, doc in chunks:
+            start, end = doc.metadata["start_byte"], doc.metadata["end_byte"]
+            if (
+                current
+                and start <= current["end"]
+                and _overlap_matches(current, start, doc)
+            ):
+                merged += 1
+                current["rank"] = min(current["rank"], rank)
+                if end > current["end"]:
+                    overlap = current["end"] - start
+                    tail = doc.page_content.encode("utf-8")[overlap:]
+                    current["text"] += tail.decode("utf-8", errors="ignore")
+                    current["end"] = end
+                continue
+            current = {
+                "rank": rank,
+                "text": doc.page_content,
+                "meta": doc.metadata,
+                "end": end,
+            }
+            blocks.append(current)
+
+    blocks.sort(key=lambda block: block["rank"])
+    return blocks, merged
+
+
+def build_context(
+    docs: List[Document], token_budget: int
+) -> Tuple[str, Dict[str, int]]:
+    """Deduplicate and pack retrieved chunks into a prompt context.
+
+    Overlapping or touching chunks from one source are merged, blocks that
+    are near-duplicates (word-shingle Jaccard) of a better-ranked block are
+    dropped (e.g. the same section in `llms.txt` and `llms-full.txt`), and
+    blocks are added in rank order until `token_budget` is reached.
+    Returns the context and token accounting for the saving.
+    """
+    raw_tokens = estimate_tokens("\n\n".join(d.page_content for d in docs))
+    blocks, merged = _merge_overlapping(docs)
+
+    kept: List[Dict[str, Any]] = []
+    duplicates = 0
+    for block in blocks:
+        shingles = _shingles(block["text"])
+        if any(_jaccard(shingles, k["shingles"]) >= DUPLICATE_JACCARD for k in kept):
+            duplicates += 1
+            continue
+        block["shingles"] = shingles
+        kept.append(block)
+
+    parts: List[str] = []
+    used = 0
+    over_budget = 0
+    for block in kept:
+        tokens = estimate_tokens(block["text"])
+        if used + tokens > token_budget:
+            if not parts:
+                parts.append(block["text"][: token_budget * CHARS_PER_TOKEN])
+                used = token_budget
+            else:
+                over_budget += 1
+            continue
+        parts.append(block["text"])
+        used += tokens
+
+    context = "\n\n".join(parts)
+    context_tokens = estimate_tokens(context)
+    stats = {
+        "chunks": len(docs),
+        "merged": merged,
+        "duplicates": duplicates,
+        "over_budget": over_budget,
+        "raw_tokens": raw_tokens,
+        "context_tokens": context_tokens,
+        "saved_tokens": max(raw_tokens - context_tokens, 0),
+    }
+    return context, stats
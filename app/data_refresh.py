@@ -1,13 +1,27 @@
+import asyncio
+import json
 import logging
 import os
-import shutil
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
-import requests
+import httpx
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from app.utils import build_vectorstore, load_docs
+from app.concurrency import run_blocking
+from app.index_store import (
+    VECTORSTORE_ROOT,
+    current_shard_dirs,
+    current_version,
+    index_exists,
+    publish_shards,
+)
+from app.ingest import shards_to_sync, sync_shards
+from app.jobs import RefreshJobManager
+from app.locks import FileLock
+from app.shards import shard_name
+from config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +32,17 @@ DATA_URLS = {
     "langchain-llms-full.txt": "https://docs.langchain.com/llms-full.txt",
 }
 
+DOWNLOAD_BLOCK_BYTES = 64 * 1024
+DOWNLOAD_STATE_PATH = Path("data/.download_state.json")
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF_SECONDS = 1.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+LEADER_LOCK_PATH = VECTORSTORE_ROOT.parent / "leader.lock"
+REFRESH_LOCK_PATH = VECTORSTORE_ROOT.parent / "refresh.lock"
+JOBS_DIR = VECTORSTORE_ROOT.parent / "jobs"
+
+Report = Callable[[str, Dict[str, Any]], None]
+
 DATA_PATHS = [
     "data/langgraph-llms.txt",
     "data/langgraph-llms-full.txt",
@@ -26,64 +51,219 @@ DATA_PATHS = [
 ]
 
 
-class DataRefresher:
-    """Automated data refresh scheduler."""
+async def _fetch(
+    client: httpx.AsyncClient, filename: str, url: str, validators: dict
+) -> Optional[dict]:
+    """Download one file if it changed upstream.
 
-    def __init__(self):
-        self.scheduler = AsyncIOScheduler()
-        self._schedule_jobs()
+    Sends the stored ETag/Last-Modified as a conditional request and
+    streams the body to a temp file that is renamed over the old one
+    (and removed if the download fails). Returns the new validators, or
+    None when the server says 304.
+    """
+    filepath = Path("data") / filename
+    headers = {}
+    if filepath.exists():
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
 
-    def _download_docs(self) -> bool:
-        """Download fresh docs."""
-        logger.info("🚀 Starting data refresh...")
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
         try:
-            for filename, url in DATA_URLS.items():
-                filepath = Path("data") / filename
-                logger.info(f"Downloading {filename}...")
-
-                response = requests.get(url, timeout=30)
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304:
+                    logger.info(f"{filename} unchanged upstream")
+                    return None
                 response.raise_for_status()
 
-                Path("data").mkdir(exist_ok=True)
-                with open(filepath, "w", encoding="utf-8") as f:
-                    f.write(response.text)
+                tmp_path = filepath.with_suffix(".tmp")
+                size = 0
+                try:
+                    with open(tmp_path, "wb") as f:
+                        async for block in response.aiter_bytes(DOWNLOAD_BLOCK_BYTES):
+                            f.write(block)
+                            size += len(block)
+                    os.replace(tmp_path, filepath)
+                finally:
+                    # A failed or cancelled download leaves the old file as is
+                    tmp_path.unlink(missing_ok=True)
 
-                logger.info(f"✅ Downloaded {filename} ({len(response.text)} chars)")
+            logger.info(f"✅ Downloaded {filename} ({size} bytes)")
+            return {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            }
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            retryable = isinstance(e, httpx.TransportError) or (
+                e.response.status_code in RETRY_STATUS_CODES
+            )
+            if not retryable or attempt == DOWNLOAD_RETRIES:
+                raise
+            delay = DOWNLOAD_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logger.warning(
+                f"Downloading {filename} failed ({e}), retry {attempt} in {delay}s"
+            )
+            await asyncio.sleep(delay)
 
-            last_update = datetime.now().isoformat()
-            with open("data/last_update.txt", "w") as f:
-                f.write(last_update)
-            logger.info(f"Data last updated: {last_update}")
-            return True
 
-        except Exception as e:
-            logger.error(f"Download failed: {e}")
-            return False
+async def download_docs() -> Optional[List[str]]:
+    """Download fresh docs concurrently.
 
-    async def _rebuild_vectorstore(self):
-        """Rebuild Chroma index."""
-        try:
-            logger.info("Rebuilding vectorstore...")
-            shutil.rmtree("vectorstore/chroma", ignore_errors=True)
-
-            docs = load_docs(DATA_PATHS)
-            if docs:
-                build_vectorstore(docs)
-                logger.info(f"Vectorstore rebuilt with {len(docs)} chunks")
-            else:
-                logger.warning("No docs to rebuild")
-
-        except Exception as e:
-            logger.error(f"Vectorstore rebuild failed: {e}")
-
-    async def refresh_all(self):
-        """Full refresh: download + rebuild."""
-        success = self._download_docs()
-        if success:
-            await self._rebuild_vectorstore()
-            logger.info("Data refresh completed!")
-        else:
-            logger.error("Data refresh failed")
+    Returns the names of the files that changed (empty if none did), or
+    None if every download failed.
+    """
+    logger.info("🚀 Starting data refresh...")
+    Path("data").mkdir(exist_ok=True)
+    state = {}
+    if DOWNLOAD_STATE_PATH.exists():
+        state = json.loads(DOWNLOAD_STATE_PATH.read_text(encoding="utf-8"))
+
+    async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+        results = await asyncio.gather(
+            *(
+                _fetch(client, filename, url, state.get(filename, {}))
+                for filename, url in DATA_URLS.items()
+            ),
+            return_exceptions=True,
+        )
+
+    changed: List[str] = []
+    failed = 0
+    for filename, result in zip(DATA_URLS, results):
+        if isinstance(result, Exception):
+            logger.error(f"Download failed for {filename}: {result}")
+            failed += 1
+        elif result is not None:
+            state[filename] = result
+            changed.append(filename)
+
+    if failed == len(DATA_URLS):
+        return None
+
+    DOWNLOAD_STATE_PATH.write_text(json.dumps(state), encoding="utf-8")
+    if changed:
+        last_update = datetime.now().isoformat()
+        with open("data/last_update.txt", "w") as f:
+            f.write(last_update)
+        logger.info(f"Data last updated: {last_update}")
+    return changed
+
+
+def _no_report(phase: str, data: Dict[str, Any]):
+    pass
+
+
+def rebuild_vectorstore(
+    report: Optional[Report] = None, sources: Optional[List[str]] = None
+) -> Optional[Dict[str, Dict[str, int]]]:
+    """Rebuild source shards to the side and publish them as a new version.
+
+    Only the shards named in `sources` (all when None) are rebuilt, plus
+    any the live index lacks; the others keep serving their current build.
+    Returns each rebuilt shard's chunk diff if a new version was
+    published, else None.
+    """
+    report = report or _no_report
+    logger.info("Rebuilding vectorstore...")
+    base = current_shard_dirs()
+    report("chunking", {})
+    # Chunks are parsed while they are embedded, so the total is the size
+    # of the planned sources and progress is how much of it was parsed
+    planned = shards_to_sync(DATA_PATHS, base, sources)
+    total_bytes = sum(os.path.getsize(path) for path in planned.values())
+
+    def embedding(done: int, parsed: int):
+        report(
+            "embedding",
+            {
+                "embedded": done,
+                "parsed_bytes": parsed,
+                "total_bytes": total_bytes,
+                "sources": len(planned),
+            },
+        )
+
+    embedding(0, 0)
+    shards, stats = sync_shards(DATA_PATHS, base, sources, progress=embedding)
+    if not shards:
+        logger.warning("No docs to rebuild")
+        return None
+    if shards == base:
+        logger.info("Docs unchanged, keeping current index")
+        return None
+    report("publishing", {})
+    publish_shards(shards)
+    logger.info(f"Vectorstore rebuilt: {stats}")
+    return stats
+
+
+def run_refresh(report: Optional[Report] = None) -> Dict[str, Any]:
+    """Full refresh: download + rebuild. Blocking; meant for a job process.
+
+    Run through `RefreshJobManager`, which holds the refresh lock meanwhile,
+    so only one process (worker or replica on the same volume) refreshes.
+    """
+    report = report or _no_report
+    report("downloading", {})
+    changed = asyncio.run(download_docs())
+    if changed is None:
+        raise RuntimeError("All documentation downloads failed")
+    if not changed and index_exists():
+        logger.info("Docs unchanged upstream, skipping rebuild")
+        return {"downloaded": False, "published": False, "chunks": None}
+
+    stats = rebuild_vectorstore(report, sources=[shard_name(f) for f in changed])
+    logger.info("Data refresh completed!")
+    return {
+        "downloaded": bool(changed),
+        "published": stats is not None,
+        "chunks": stats,
+    }
+
+
+class DataRefresher:
+    """Automated data refresh scheduler.
+
+    Every worker process runs one, but only the process holding the leader
+    lock schedules refreshes; another one takes over within
+    `INDEX_POLL_SECONDS` if it exits. All of them poll the published index
+    version and call `on_index_published` when it moves on, so followers
+    switch to the leader's index without embedding anything.
+    """
+
+    def __init__(self, on_index_published: Optional[Callable[[], Any]] = None):
+        self.scheduler = AsyncIOScheduler()
+        self.on_index_published = on_index_published
+        self.jobs = RefreshJobManager(
+            run_refresh,
+            JOBS_DIR,
+            on_success=self._on_refreshed,
+            lock_path=REFRESH_LOCK_PATH,
+        )
+        self.leader = FileLock(LEADER_LOCK_PATH)
+        self._version = current_version()
+
+    def _on_refreshed(self, result: Dict[str, Any]):
+        if result.get("published") and self.on_index_published:
+            self.on_index_published()
+
+    async def _watch(self):
+        """Claim leadership if it is free and pick up newly published versions."""
+        if not self.leader.held and self.leader.acquire():
+            logger.info(f"Process {os.getpid()} is the data refresh leader")
+            self._schedule_jobs()
+
+        version = await run_blocking(current_version)
+        if version != self._version:
+            self._version = version
+            logger.info(f"Index version {version} was published, reloading")
+            if self.on_index_published:
+                await run_blocking(self.on_index_published)
+
+    async def refresh_all(self) -> Dict[str, Any]:
+        """Queue a full refresh in a background process (or join the running one)."""
+        return await run_blocking(self.jobs.submit)
 
     def _schedule_jobs(self):
         """Schedule weekly/monthly jobs."""
@@ -113,10 +293,20 @@ class DataRefresher:
 
     async def start(self):
         """Start scheduler."""
+        self.scheduler.add_job(
+            self._watch,
+            "interval",
+            seconds=settings.INDEX_POLL_SECONDS,
+            id="index_watch",
+            replace_existing=True,
+        )
         self.scheduler.start()
+        await self._watch()
         logger.info("Data refresher started")
 
     async def shutdown(self):
         """Stop scheduler."""
         self.scheduler.shutdown()
+        await run_blocking(self.jobs.shutdown)
+        self.leader.release()
         logger.info("Data refresher stopped")
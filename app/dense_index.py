@@ -0,0 +1,184 @@
+import json
+import logging
+import mmap
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+DENSE_VECTORS_NAME = "dense_vectors.npy"
+DENSE_SCALES_NAME = "dense_scales.npy"
+DENSE_IDS_NAME = "dense_ids.npy"
+DENSE_DOCS_NAME = "dense_docs.jsonl"
+DENSE_OFFSETS_NAME = "dense_offsets.npy"
+DENSE_DTYPES = ("float32", "int8")
+EXPORT_PAGE_SIZE = 1000
+SEARCH_BLOCK_ROWS = 16384
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _iter_collection(collection: Any) -> Iterable[Dict[str, Any]]:
+    """Page through a Chroma collection with embeddings, text and metadata."""
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=EXPORT_PAGE_SIZE,
+            offset=offset,
+        )
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def write_dense_index(collection: Any, index_dir: Path, dtype: str = "float32") -> int:
+    """Export a Chroma collection into the memory-mappable dense format.
+
+    Vectors are L2-normalized and stored as one contiguous matrix, either
+    float32 or int8 with a per-row scale. Chunk text and metadata go to a
+    JSON-lines table addressed by byte offsets. Returns the row count.
+    """
+    if dtype not in DENSE_DTYPES:
+        raise ValueError(f"Unsupported dense index dtype={dtype}")
+    index_dir = Path(index_dir)
+
+    ids: List[str] = []
+    blocks: List[np.ndarray] = []
+    offsets = [0]
+    with open(index_dir / DENSE_DOCS_NAME, "wb") as f:
+        for page in _iter_collection(collection):
+            ids.extend(page["ids"])
+            blocks.append(np.asarray(page["embeddings"], dtype=np.float32))
+            for text, metadata in zip(page["documents"], page["metadatas"]):
+                line = json.dumps({"text": text, "metadata": metadata or {}})
+                offsets.append(offsets[-1] + f.write(line.encode("utf-8") + b"\n"))
+
+    vectors = (
+        _normalize(np.concatenate(blocks))
+        if blocks
+        else np.zeros((0, 0), dtype=np.float32)
+    )
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1, initial=0) / 127
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        np.save(index_dir / DENSE_SCALES_NAME, scales)
+        vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+    np.save(index_dir / DENSE_VECTORS_NAME, vectors)
+    np.save(index_dir / DENSE_IDS_NAME, np.array(ids, dtype="S"))
+    np.save(index_dir / DENSE_OFFSETS_NAME, np.array(offsets, dtype=np.int64))
+    logger.info(f"Wrote {dtype} dense index with {len(ids)} vectors to {index_dir}")
+    return len(ids)
+
+
+class DenseIndex:
+    """Read-only, memory-mapped vector index of one index version.
+
+    All arrays and the document table are mapped from disk, so worker
+    processes serving the same version share their pages through the OS
+    page cache instead of each holding a private copy. Exposes the subset
+    of the Chroma vectorstore API that retrieval uses.
+    """
+
+    def __init__(self, index_dir: Path):
+        index_dir = Path(index_dir)
+        self.vectors = np.load(index_dir / DENSE_VECTORS_NAME, mmap_mode="r")
+        self.ids = np.load(index_dir / DENSE_IDS_NAME, mmap_mode="r")
+        self.offsets = np.load(index_dir / DENSE_OFFSETS_NAME, mmap_mode="r")
+        self.scales = None
+        if self.vectors.dtype == np.int8:
+            self.scales = np.load(index_dir / DENSE_SCALES_NAME, mmap_mode="r")
+        self._docs_file = open(index_dir / DENSE_DOCS_NAME, "rb")
+        self._docs = (
+            mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.ids)
+            else b""
+        )
+        self._rows: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def load(cls, index_dir: Path) -> Optional["DenseIndex"]:
+        """Open the dense index of an index version, if it has one."""
+        if not (Path(index_dir) / DENSE_VECTORS_NAME).exists():
+            return None
+        index = cls(index_dir)
+        logger.info(
+            f"Mapped {index.vectors.dtype} dense index with {len(index)} vectors"
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, embeddings: List[List[float]]) -> np.ndarray:
+        """Cosine similarity of every row to each query, shape (rows, queries)."""
+        queries = _normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        if self.scales is None:
+            return self.vectors @ queries.T
+        # int8 rows are widened block by block to bound the temporary copy
+        scores = np.empty((len(self), len(queries)), dtype=np.float32)
+        for start in range(0, len(self), SEARCH_BLOCK_ROWS):
+            block = self.vectors[start : start + SEARCH_BLOCK_ROWS]
+            scores[start : start + len(block)] = block.astype(np.float32) @ queries.T
+        return scores * self.scales[:, None]
+
+    def search(self, embedding: List[float], k: int) -> List[int]:
+        """Row numbers of the top `k` rows, best first."""
+        return self.search_many([embedding], k)[0]
+
+    def search_many(self, embeddings: List[List[float]], k: int) -> List[List[int]]:
+        """Top `k` row numbers for each query, from one matrix product."""
+        if not len(self) or k <= 0:
+            return [[] for _ in embeddings]
+        scores = self.scores(embeddings).T
+        if k < len(self):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(len(self)), (len(scores), 1))
+        order = np.argsort(
+            -np.take_along_axis(scores, top, axis=1), axis=1, kind="stable"
+        )
+        return np.take_along_axis(top, order, axis=1).tolist()
+
+    def document(self, row: int) -> Document:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        record = json.loads(self._docs[start:end])
+        return Document(
+            id=self.ids[row].decode("ascii"),
+            page_content=record["text"],
+            metadata=record["metadata"],
+        )
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [self.document(row) for row in self.search(embedding, k)]
+
+    def similarity_search_by_vectors(
+        self, embeddings: List[List[float]], k: int = 4
+    ) -> List[List[Document]]:
+        return [
+            [self.document(row) for row in rows]
+            for rows in self.search_many(embeddings, k)
+        ]
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        if self._rows is None:
+            self._rows = {cid.decode("ascii"): row for row, cid in enumerate(self.ids)}
+        return [self.document(self._rows[cid]) for cid in ids if cid in self._rows]
+
+    def close(self):
+        if isinstance(self._docs, mmap.mmap):
+            self._docs.close()
+        self._docs_file.close()
+        self.vectors = self.ids = self.offsets = self.scales = None
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from app.cache import TTLCache
+from app.metrics import CACHE_LOOKUPS, EMBED_BATCH_SIZE
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingEmbedder(Embeddings):
+    """Query embedder that batches concurrent queries and caches repeats.
+
+    Query embeddings are served from an LRU cache of `cache_size` entries.
+    Misses go to one dispatcher thread, which waits up to `window_ms` after
+    the first queued query (or until `max_batch` are queued) and embeds them
+    all in a single `embed_documents` call, so many concurrent requests
+    share one forward pass instead of taking one each. Document embedding
+    is passed straight through.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        window_ms: float,
+        max_batch: int,
+        cache_size: int,
+    ):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000
+        self.max_batch = max(max_batch, 1)
+        self._cache = TTLCache(cache_size, ttl=math.inf)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+        return self._submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Like `embed_query`, without holding a thread while the batch fills."""
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+        return await asyncio.wrap_future(self._submit(text))
+
+    def _cached(self, text: str) -> Optional[List[float]]:
+        if self._cache.maxsize <= 0:
+            return None
+        vector = self._cache.get(text)
+        CACHE_LOOKUPS.labels("embedding", "miss" if vector is None else "hit").inc()
+        return vector
+
+    def _submit(self, text: str) -> Future:
+        if self._dispatcher is None:
+            with self._lock:
+                if self._dispatcher is None:
+                    self._dispatcher = threading.Thread(
+                        target=self._run, name="query-embedder", daemon=True
+                    )
+                    self._dispatcher.start()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(
+                        self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    )
+                except queue.Empty:
+                    break
+            try:
+                self._embed(batch)
+            except Exception as e:
+                logger.error(f"Query embedding dispatcher failed on a batch: {e}")
+
+    def _embed(self, batch: List[Tuple[str, Future]]):
+        # Callers that gave up (e.g. a disconnected stream) are dropped
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        EMBED_BATCH_SIZE.observe(len(texts))
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            logger.error(f"Embedding a batch of {len(texts)} queries failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        by_text = dict(zip(texts, vectors))
+        for text, vector in by_text.items():
+            self._cache.set(text, vector)
+        for text, future in batch:
+            future.set_result(by_text[text])
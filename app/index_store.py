@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+VECTORSTORE_ROOT = Path("vectorstore/chroma")
+CURRENT_POINTER = VECTORSTORE_ROOT / "CURRENT"
+VERSION_PREFIX = "v"
+KEEP_VERSIONS = 2
+SHARDS_ROOT = VECTORSTORE_ROOT.parent / "shards"
+SHARD_MAP_NAME = "shards.json"
+# Versions built before sharding hold one index of every source
+LEGACY_SHARD = "all"
+
+
+def current_version() -> Optional[str]:
+    """Return the name of the published index version, if any."""
+    try:
+        version = CURRENT_POINTER.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def index_dir(version: Optional[str]) -> Path:
+    """Directory holding the given index version.
+
+    `None` maps to the flat pre-versioning layout (`vectorstore/chroma`),
+    used until something is published through `publish_index`.
+    """
+    if version:
+        return VECTORSTORE_ROOT / version
+    return VECTORSTORE_ROOT
+
+
+def current_index_dir() -> Path:
+    """Directory of the live index."""
+    return index_dir(current_version())
+
+
+def index_exists() -> bool:
+    """Whether a built index is available to serve."""
+    path = current_index_dir()
+    if not path.exists():
+        return False
+    return any(p.name != CURRENT_POINTER.name for p in path.iterdir())
+
+
+def _new_version() -> str:
+    return f"{VERSION_PREFIX}{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+
+
+def new_index_dir() -> Path:
+    """Create an empty, unpublished version directory to build into."""
+    path = VECTORSTORE_ROOT / _new_version()
+    path.mkdir(parents=True, exist_ok=False)
+    return path
+
+
+def shard_dirs(version: Optional[str]) -> Dict[str, Path]:
+    """Directory of each shard (one per source) of an index version.
+
+    A version is a `shards.json` mapping shard names to shard builds under
+    `vectorstore/shards/<shard>/`, so versions share the builds of shards
+    that did not change. Versions from before sharding are served as the
+    single shard `all`.
+    """
+    path = index_dir(version)
+    try:
+        shards = json.loads((path / SHARD_MAP_NAME).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {LEGACY_SHARD: path}
+    return {name: SHARDS_ROOT / build for name, build in shards.items()}
+
+
+def current_shard_dirs() -> Dict[str, Path]:
+    """Shard directories of the live index."""
+    return shard_dirs(current_version())
+
+
+def new_shard_dir(shard: str) -> Path:
+    """Create an empty, unpublished build directory for one shard."""
+    path = SHARDS_ROOT / shard / _new_version()
+    path.mkdir(parents=True, exist_ok=False)
+    return path
+
+
+def publish_shards(shards: Dict[str, Path]) -> Path:
+    """Publish a new index version made of the given shard builds."""
+    path = new_index_dir()
+    with open(path / SHARD_MAP_NAME, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                name: build.relative_to(SHARDS_ROOT).as_posix()
+                for name, build in shards.items()
+            },
+            f,
+        )
+    publish_index(path)
+    return path
+
+
+def publish_index(path: Path):
+    """Atomically point `CURRENT` at a fully built version directory."""
+    tmp_pointer = CURRENT_POINTER.with_suffix(".tmp")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(path.name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, CURRENT_POINTER)
+    logger.info(f"Published index version {path.name}")
+    prune_versions()
+
+
+def discard_index(path: Path):
+    """Remove a version directory that failed to build."""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _versions() -> List[Path]:
+    if not VECTORSTORE_ROOT.exists():
+        return []
+    return sorted(
+        p
+        for p in VECTORSTORE_ROOT.iterdir()
+        if p.is_dir() and p.name.startswith(VERSION_PREFIX)
+    )
+
+
+def prune_versions(keep: int = KEEP_VERSIONS):
+    """Delete old version directories, keeping the newest `keep`.
+
+    The previous version is kept so agents still draining in-flight
+    requests against it are not pulled out from under. Files from the
+    flat pre-versioning layout are dropped once enough versions exist.
+    """
+    current = current_version()
+    versions = [p for p in _versions() if p.name != current]
+    stale = versions[: max(len(versions) - (keep - 1), 0)]
+    for path in stale:
+        shutil.rmtree(path, ignore_errors=True)
+        logger.info(f"Pruned index version {path.name}")
+
+    if current and len(_versions()) >= keep:
+        for path in VECTORSTORE_ROOT.iterdir():
+            if path.name.startswith(VERSION_PREFIX) or path.name.startswith(
+                CURRENT_POINTER.name
+            ):
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+    prune_shards()
+
+
+def prune_shards():
+    """Delete shard builds that no remaining version uses.
+
+    Only builds older than a shard's newest used one are candidates, so a
+    build still in progress is never removed.
+    """
+    if not SHARDS_ROOT.exists():
+        return
+    used = {
+        path.resolve()
+        for version in [p.name for p in _versions()]
+        for path in shard_dirs(version).values()
+    }
+    for shard in SHARDS_ROOT.iterdir():
+        builds = sorted(p for p in shard.iterdir() if p.is_dir())
+        newest_used = max((p.name for p in builds if p.resolve() in used), default="")
+        for path in builds:
+            if path.name < newest_used and path.resolve() not in used:
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Pruned shard build {shard.name}/{path.name}")
+
+
+def close_vectorstore(vectorstore: Any):
+    """Release the Chroma client (or mapped files) of an index no longer served."""
+    close = getattr(vectorstore, "close", None)
+    if close is None:
+        client = getattr(vectorstore, "_client", None)
+        close = getattr(client, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception as e:
+        logger.warning(f"Failed to close retired vectorstore: {e}")
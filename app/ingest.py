@@ -0,0 +1,339 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.dense_index import write_dense_index
+from app.index_store import discard_index, new_shard_dir
+from app.lexical import BM25Index
+from app.shards import shard_name
+from app.utils import COLLECTION_NAME, get_embeddings, iter_chunks, splitter_fingerprint
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+DELETE_BATCH_SIZE = 1000
+UPDATE_BATCH_SIZE = 1000
+
+_worker_embeddings = None
+
+
+def _init_worker(threads: int):
+    """Load the embedding model once per worker process."""
+    global _worker_embeddings
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_embeddings = get_embeddings()
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_embeddings.embed_documents(texts)
+
+
+def _batches(items: Iterable, size: int) -> Iterable[List]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _resolve_workers(workers: Optional[int]) -> int:
+    workers = settings.INGEST_WORKERS if workers is None else workers
+    if workers <= 0:
+        workers = max((os.cpu_count() or 1) - 1, 1)
+    return workers
+
+
+def embed_and_upsert(
+    vectorstore: Any,
+    chunks: Iterable[Tuple[str, Any]],
+    embeddings: Optional[Any] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Embed `(chunk_id, document)` pairs in batches and upsert them.
+
+    Chunks are consumed lazily. With more than one worker, batches are
+    embedded in a process pool (each worker loads its own model) and
+    written to Chroma as they complete; otherwise `embeddings` is used
+    inline. Returns the number of chunks written.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    workers = _resolve_workers(workers)
+    collection = vectorstore._collection
+    done = 0
+    started = time.perf_counter()
+
+    def upsert(batch: List[Tuple[str, Any]], vectors: List[List[float]]):
+        nonlocal done
+        collection.upsert(
+            ids=[cid for cid, _ in batch],
+            embeddings=vectors,
+            documents=[doc.page_content for _, doc in batch],
+            metadatas=[doc.metadata for _, doc in batch],
+        )
+        done += len(batch)
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        logger.info(f"Embedded {done} chunks ({rate:.1f} chunks/s)")
+        if progress:
+            progress(done)
+
+    if workers == 1:
+        for batch in _batches(chunks, batch_size):
+            embeddings = embeddings or get_embeddings()
+            texts = [doc.page_content for _, doc in batch]
+            upsert(batch, embeddings.embed_documents(texts))
+    else:
+        threads = max((os.cpu_count() or 1) // workers, 1)
+        logger.info(f"Embedding with {workers} workers x {threads} threads")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,),
+        ) as pool:
+            pending: Dict[Future, List[Tuple[str, Any]]] = {}
+            for batch in _batches(chunks, batch_size):
+                if len(pending) >= workers * 2:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        upsert(pending.pop(future), future.result())
+                texts = [doc.page_content for _, doc in batch]
+                pending[pool.submit(_embed_batch, texts)] = batch
+            for future in list(pending):
+                upsert(pending.pop(future), future.result())
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Embedded {done} chunks in {elapsed:.1f}s "
+        f"({done / max(elapsed, 1e-9):.1f} chunks/s)"
+    )
+    return done
+
+
+def load_manifest(index_dir: Optional[Path]) -> Optional[Dict[str, Any]]:
+    """Read the chunk manifest of an index, if it has one."""
+    if index_dir is None:
+        return None
+    path = Path(index_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(index_dir: Path, chunks: Dict[str, str]):
+    """Record which chunk ids (and their sources) an index contains."""
+    manifest = {"splitter": splitter_fingerprint(), "chunks": chunks}
+    with open(Path(index_dir) / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def existing_chunks(base_dir: Optional[Path]) -> Set[str]:
+    """Chunk ids of `base_dir` that can be reused (same splitter config)."""
+    manifest = load_manifest(base_dir)
+    if manifest and manifest.get("splitter") == splitter_fingerprint():
+        return set(manifest["chunks"])
+    return set()
+
+
+def sync_index(
+    docs: Iterable,
+    target_dir: Path,
+    base_dir: Optional[Path] = None,
+    embeddings: Optional[Any] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, int]:
+    """Build `target_dir` from `docs`, re-embedding only what changed.
+
+    When `base_dir` holds an index built with the same splitter config,
+    it is copied into `target_dir` and only the difference is applied:
+    new chunks are embedded and upserted, chunks no longer present are
+    deleted; unchanged chunks only get their metadata (byte offsets,
+    heading) refreshed. Otherwise every chunk is embedded from scratch.
+    `docs` is consumed lazily, so embedding starts while it is still
+    being produced; `progress(embedded, parsed_bytes)` reports chunks
+    embedded and how far into the source parsing has got.
+    The BM25 lexical index and the memory-mapped dense index are always
+    rebuilt from all chunks (no embedding involved, so they are cheap).
+    """
+    from langchain_chroma import Chroma
+
+    existing = existing_chunks(base_dir)
+    if existing:
+        logger.info(f"Incremental ingest on top of {base_dir}")
+        shutil.copytree(base_dir, target_dir, dirs_exist_ok=True)
+    else:
+        logger.info("No compatible manifest found, embedding all chunks")
+
+    seen: Dict[str, str] = {}
+    kept: List[Tuple[str, Dict[str, Any]]] = []
+    lexical = BM25Index()
+    embedded = parsed = 0
+    report_every = batch_size or settings.INGEST_BATCH_SIZE
+
+    def report(done: Optional[int] = None):
+        nonlocal embedded
+        embedded = embedded if done is None else done
+        if progress:
+            progress(embedded, parsed)
+
+    def new_chunks() -> Iterable[Tuple[str, Any]]:
+        nonlocal parsed
+        for doc in docs:
+            cid = doc.metadata["chunk_id"]
+            parsed = max(parsed, doc.metadata.get("end_byte", 0))
+            if cid in seen:
+                continue
+            seen[cid] = doc.metadata["source"]
+            lexical.add(cid, doc.page_content)
+            if cid in existing:
+                kept.append((cid, doc.metadata))
+                # Unchanged chunks are not embedded, but parsing moves on
+                if len(kept) % report_every == 0:
+                    report()
+            else:
+                yield cid, doc
+
+    vectorstore = Chroma(
+        persist_directory=str(target_dir), collection_name=COLLECTION_NAME
+    )
+    added = embed_and_upsert(
+        vectorstore,
+        new_chunks(),
+        embeddings=embeddings,
+        batch_size=batch_size,
+        workers=workers,
+        progress=report,
+    )
+    report()
+    removed = [cid for cid in existing if cid not in seen]
+    for batch in _batches(removed, DELETE_BATCH_SIZE):
+        vectorstore.delete(ids=batch)
+    # Text above an unchanged chunk may have moved it within its source
+    for batch in _batches(kept, UPDATE_BATCH_SIZE):
+        vectorstore._collection.update(
+            ids=[cid for cid, _ in batch], metadatas=[meta for _, meta in batch]
+        )
+
+    write_manifest(target_dir, seen)
+    lexical.save(target_dir)
+    write_dense_index(vectorstore._collection, target_dir, settings.DENSE_INDEX_DTYPE)
+    stats = {
+        "total": len(seen),
+        "added": added,
+        "removed": len(removed),
+        "unchanged": len(seen) - added,
+    }
+    logger.info(f"Chunk diff: {stats}")
+    return stats
+
+
+def shards_to_sync(
+    paths: List[str], base: Dict[str, Path], sources: Optional[Iterable[str]] = None
+) -> Dict[str, str]:
+    """Shard name -> source path of each shard `sync_shards` would rebuild.
+
+    That is every shard named in `sources` (all when None) plus any shard
+    without a compatible build in `base`. Sources missing on disk are left
+    out.
+    """
+    names = {shard_name(path) for path in paths}
+    wanted = None if sources is None else set(sources)
+    if wanted is not None and wanted - names:
+        raise ValueError(f"Unknown source shards: {sorted(wanted - names)}")
+    return {
+        shard_name(path): path
+        for path in paths
+        if os.path.exists(path)
+        and (
+            wanted is None
+            or shard_name(path) in wanted
+            or not existing_chunks(base.get(shard_name(path)))
+        )
+    }
+
+
+def sync_shards(
+    paths: List[str],
+    base: Dict[str, Path],
+    sources: Optional[Iterable[str]] = None,
+    embeddings: Optional[Any] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[Dict[str, Path], Dict[str, Dict[str, int]]]:
+    """Build one index shard per source file of `paths`.
+
+    Shards picked by `shards_to_sync` are synced into a new build on top
+    of their `base` build, re-embedding only what changed; a rebuild that
+    changed nothing is dropped in favour of the base build. Every other
+    shard keeps its base build untouched. Returns the shard builds making
+    up the new version and the chunk diff of each rebuilt shard.
+    `progress(embedded, parsed_bytes)` counts across the rebuilt shards.
+    """
+    plan = shards_to_sync(paths, base, sources)
+    shards: Dict[str, Path] = {}
+    stats: Dict[str, Dict[str, int]] = {}
+    built: List[Path] = []
+    embedded = parsed = 0
+
+    def shard_progress(
+        chunks_before: int, bytes_before: int
+    ) -> Optional[Callable[[int, int], None]]:
+        if progress is None:
+            return None
+        return lambda done, read: progress(chunks_before + done, bytes_before + read)
+
+    try:
+        for path in paths:
+            name = shard_name(path)
+            if name not in plan:
+                if name in base and os.path.exists(path):
+                    shards[name] = base[name]
+                continue
+            logger.info(f"Syncing shard {name}")
+            build = new_shard_dir(name)
+            built.append(build)
+            stats[name] = sync_index(
+                iter_chunks([path]),
+                build,
+                base_dir=base.get(name),
+                embeddings=embeddings,
+                batch_size=batch_size,
+                workers=workers,
+                progress=shard_progress(embedded, parsed),
+            )
+            embedded += stats[name]["added"]
+            parsed += os.path.getsize(path)
+            if progress:
+                progress(embedded, parsed)
+            unchanged = not stats[name]["added"] and not stats[name]["removed"]
+            if name in base and unchanged:
+                discard_index(build)
+                shards[name] = base[name]
+            elif stats[name]["total"]:
+                shards[name] = build
+            else:
+                discard_index(build)
+    except Exception:
+        for build in built:
+            discard_index(build)
+        raise
+    return shards, stats
@@ -0,0 +1,220 @@
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from app.locks import FileLock
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+MAX_FINISHED_JOBS = 20
+JOB_START_SECONDS = 60
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{12}")
+
+
+def _read_job(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_job(path: Path, job: Dict[str, Any]):
+    """Replace `path` with the job's public fields, atomically for readers."""
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({k: v for k, v in job.items() if not k.startswith("_")}))
+    os.replace(tmp, path)
+
+
+def _finish(job: Dict[str, Any], status: str, result=None, error=None):
+    _enter_phase(job, "done" if status == "succeeded" else "failed")
+    job["status"] = status
+    job["result"] = result
+    job["error"] = error
+    job["finished_at"] = datetime.now().isoformat()
+    job["timings"]["total"] = round(
+        time.time() - datetime.fromisoformat(job["created_at"]).timestamp(), 3
+    )
+
+
+def _enter_phase(job: Dict[str, Any], phase: str):
+    now = time.time()
+    previous = job["phase"]
+    job["timings"][previous] = round(
+        job["timings"].get(previous, 0) + now - job.get("_phase_started", now), 3
+    )
+    job["phase"] = phase
+    job["_phase_started"] = now
+
+
+def _run_in_child(target: Callable, path: Path, lock_path: Optional[Path]):
+    """Child-process entry point: run `target(report)`, recording it in `path`."""
+    logging.basicConfig(level=logging.INFO)
+    job = _read_job(path)
+    job["_phase_started"] = datetime.fromisoformat(job["created_at"]).timestamp()
+
+    lock = FileLock(lock_path, owner=job["id"]) if lock_path else None
+    if lock and not lock.acquire():
+        running = FileLock(lock_path).holder()
+        logger.info(f"Refresh job {running} is already running, skipping")
+        _finish(job, "succeeded", result={"skipped": True, "running_job": running})
+        _write_job(path, job)
+        return
+
+    def report(phase: str, data: Dict[str, Any]):
+        if phase != job["phase"]:
+            _enter_phase(job, phase)
+        if data:
+            job["progress"] = data
+        _write_job(path, job)
+
+    try:
+        _finish(job, "succeeded", result=target(report))
+    except Exception as e:
+        logger.exception("Refresh job failed")
+        _finish(job, "failed", error=str(e))
+    finally:
+        _write_job(path, job)
+        if lock:
+            lock.release()
+
+
+class RefreshJobManager:
+    """Runs refresh jobs one at a time in a child process, state in `state_dir`."""
+
+    def __init__(
+        self,
+        target: Callable[[Callable[[str, Dict[str, Any]], None]], Dict[str, Any]],
+        state_dir: Path,
+        on_success: Optional[Callable[[Dict[str, Any]], None]] = None,
+        lock_path: Optional[Path] = None,
+    ):
+        self.target = target
+        self.state_dir = Path(state_dir)
+        self.on_success = on_success
+        self.lock_path = lock_path
+        self._running: Optional[str] = None
+        self._process: Optional[Any] = None
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+
+    def submit(self) -> Dict[str, Any]:
+        with self._lock:
+            running = self._running or self._running_elsewhere()
+            job = self.get(running) if running else None
+            if job is not None and job["status"] == "running":
+                logger.info(f"Refresh job {running} already running")
+                return {**job, "deduplicated": True}
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "id": job_id,
+                "status": "running",
+                "phase": "starting",
+                "progress": {},
+                "timings": {},
+                "created_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            _write_job(self._path(job_id), job)
+            self._running = job_id
+            self._prune()
+
+            process = self._context.Process(
+                target=_run_in_child,
+                args=(self.target, self._path(job_id), self.lock_path),
+                name=f"refresh-{job_id}",
+            )
+            process.start()
+            self._process = process
+            threading.Thread(
+                target=self._watch,
+                args=(job_id, process),
+                name=f"refresh-watch-{job_id}",
+                daemon=True,
+            ).start()
+            logger.info(f"Started refresh job {job_id} (pid {process.pid})")
+            return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        return _read_job(self._path(job_id))
+
+    def _path(self, job_id: str) -> Path:
+        return self.state_dir / f"{job_id}.json"
+
+    def _running_elsewhere(self) -> Optional[str]:
+        """Id of the job holding `lock_path` in another process, if any."""
+        if self.lock_path is None:
+            return None
+        probe = FileLock(self.lock_path)
+        if not probe.acquire():
+            return probe.holder()
+        probe.release()
+        # Submitted elsewhere, but its process has not taken the lock yet
+        for path in self.state_dir.glob("*.json"):
+            job = _read_job(path) or {}
+            created = job.get("created_at")
+            if job.get("phase") == "starting" and created:
+                age = time.time() - datetime.fromisoformat(created).timestamp()
+                if age < JOB_START_SECONDS:
+                    return job["id"]
+        return None
+
+    def _watch(self, job_id: str, process: Any):
+        process.join()
+        with self._lock:
+            job = self.get(job_id)
+            self._running = None
+            self._process = None
+            if job is None:
+                logger.warning(f"Refresh job {job_id} state file is gone")
+                return
+            if job["status"] == "running":
+                _finish(
+                    job,
+                    "failed",
+                    error=f"Refresh process exited with code {process.exitcode}",
+                )
+                _write_job(self._path(job_id), job)
+
+        logger.info(f"Refresh job {job_id} finished: {job['status']}")
+        if job["status"] == "succeeded" and self.on_success:
+            try:
+                self.on_success(job["result"])
+            except Exception as e:
+                logger.error(f"Refresh job {job_id} success hook failed: {e}")
+
+    def shutdown(self, timeout: float = 5):
+        """Terminate the running job, if any (its partial build is pruned later)."""
+        with self._lock:
+            process = self._process
+        if process is None or not process.is_alive():
+            return
+        logger.info(f"Terminating refresh job {self._running} (pid {process.pid})")
+        process.terminate()
+        process.join(timeout=timeout)
+
+    def _prune(self):
+        jobs = sorted(self.state_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        finished = [
+            path
+            for path in jobs
+            if (_read_job(path) or {}).get("status", "failed") != "running"
+        ]
+        for path in finished[: max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,109 @@
+import gzip
+import heapq
+import json
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_INDEX_NAME = "lexical.json.gz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how i if in into is it of on or that the "
+    "this to was what when which with you your do does can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms, keeping API names whole as well as their parts.
+
+    `add_conditional_edges` yields itself plus `add`, `conditional` and
+    `edges`; `StateGraph` yields `stategraph`, `state` and `graph`.
+    """
+    terms: List[str] = []
+    for word in _IDENTIFIER.findall(text):
+        lower = word.lower()
+        if lower in _STOPWORDS:
+            continue
+        terms.append(lower)
+        parts = [
+            p.lower() for piece in word.split("_") for p in _CAMEL_PART.findall(piece)
+        ]
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p not in _STOPWORDS)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over chunk ids, built at ingest and stored next to Chroma."""
+
+    def __init__(
+        self,
+        ids: Optional[List[str]] = None,
+        lengths: Optional[List[int]] = None,
+        postings: Optional[Dict[str, List[Tuple[int, int]]]] = None,
+    ):
+        self.ids = ids or []
+        self.lengths = lengths or []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.postings.update(postings or {})
+        self._total_length = sum(self.lengths)
+
+    def add(self, chunk_id: str, text: str):
+        terms = Counter(tokenize(text))
+        doc = len(self.ids)
+        self.ids.append(chunk_id)
+        self.lengths.append(sum(terms.values()))
+        self._total_length += self.lengths[-1]
+        for term, tf in terms.items():
+            self.postings[term].append((doc, tf))
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top `k` `(chunk_id, score)` pairs for `query`."""
+        n = len(self.ids)
+        if not n:
+            return []
+        avgdl = self._total_length / n
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for doc, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc] / avgdl)
+                scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.ids[doc], score) for doc, score in top]
+
+    def save(self, index_dir: Path):
+        path = Path(index_dir) / LEXICAL_INDEX_NAME
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(
+                {"ids": self.ids, "lengths": self.lengths, "postings": self.postings},
+                f,
+            )
+        logger.info(f"Saved lexical index with {len(self.ids)} chunks to {path}")
+
+    @classmethod
+    def load(cls, index_dir: Path) -> Optional["BM25Index"]:
+        """Load the lexical index of an index version, if it has one."""
+        path = Path(index_dir) / LEXICAL_INDEX_NAME
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        logger.info(f"Loaded lexical index with {len(data['ids'])} chunks")
+        return cls(data["ids"], data["lengths"], data["postings"])
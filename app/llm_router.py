@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from app.metrics import LLM_ROUTER_EVENTS
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+MIN_HEDGE_DELAY = 0.05
+# Provider calls run without the caller's callbacks: the router's own run is
+# what traces, token counters and the streaming handler see, exactly once
+ISOLATED = {"callbacks": []}
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; one trial call after `cooldown`."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial)
+
+    def begin(self):
+        if self.opened_at is not None:
+            self._trial = True
+
+    def cancel(self):
+        """A call was cancelled before finishing: neither success nor failure."""
+        self._trial = False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failure(self) -> bool:
+        """Record a failure; True if this opened the breaker."""
+        self.failures += 1
+        trial, self._trial = self._trial, False
+        if trial or (self.opened_at is None and self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class RouterState:
+    """Latencies, breakers and counters of a router and its tool-bound copies."""
+
+    def __init__(self, providers: List[str], threshold: int, cooldown: float):
+        self.providers = providers
+        self.breakers = {p: CircuitBreaker(threshold, cooldown) for p in providers}
+        self.latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        self.counts: Dict[str, Dict[str, int]] = {p: {} for p in providers}
+        self.requests = 0
+
+    def record(self, provider: str, event: str):
+        counts = self.counts[provider]
+        counts[event] = counts.get(event, 0) + 1
+        LLM_ROUTER_EVENTS.labels(provider, event).inc()
+
+    def available(self) -> List[str]:
+        return [p for p in self.providers if self.breakers[p].available()]
+
+    def deadline(
+        self, provider: str, kind: str, percentile: float, default: float
+    ) -> float:
+        """Hedge delay: the `percentile` of `provider`'s recent `kind` latency."""
+        samples = sorted(self.latencies.get((provider, kind), ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return default
+        index = min(int(len(samples) * percentile / 100), len(samples) - 1)
+        return max(samples[index], MIN_HEDGE_DELAY)
+
+    def success(self, provider: str, kind: str, seconds: float):
+        self.breakers[provider].success()
+        window = self.latencies.setdefault(
+            (provider, kind), deque(maxlen=LATENCY_WINDOW)
+        )
+        window.append(seconds)
+
+    def failure(self, provider: str, error: BaseException):
+        self.record(provider, "error")
+        if self.breakers[provider].failure():
+            self.record(provider, "breaker_open")
+            logger.warning(f"Circuit breaker open for {provider} after: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedge rate over all requests and each provider's share of wins."""
+        wins = sum(c.get("win", 0) for c in self.counts.values()) or 1
+        hedges = sum(c.get("hedge", 0) for c in self.counts.values())
+        return {
+            "requests": self.requests,
+            "hedge_rate": round(hedges / max(self.requests, 1), 4),
+            "providers": {
+                p: {
+                    **self.counts[p],
+                    "win_rate": round(self.counts[p].get("win", 0) / wins, 4),
+                    "breaker": self.breakers[p].state,
+                }
+                for p in self.providers
+            },
+        }
+
+
+class HedgedChatModel(BaseChatModel):
+    """Chat model that hedges slow calls and fails over across providers."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    models: Dict[str, Any]
+    state: RouterState
+    hedge_percentile: float = 95
+    hedge_delay: float = 3.0
+
+    @classmethod
+    def from_models(
+        cls,
+        models: Dict[str, Any],
+        breaker_failures: int = 5,
+        breaker_cooldown: float = 30,
+        **kwargs: Any,
+    ) -> "HedgedChatModel":
+        state = RouterState(list(models), breaker_failures, breaker_cooldown)
+        return cls(models=models, state=state, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-router"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"providers": list(self.models)}
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any) -> "HedgedChatModel":
+        """Bind `tools` to every provider; the copy shares this router's state."""
+        return self.model_copy(
+            update={
+                "models": {
+                    name: model.bind_tools(tools, **kwargs)
+                    for name, model in self.models.items()
+                }
+            }
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return self.state.stats()
+
+    async def _race(
+        self,
+        kind: str,
+        start: Callable[[str], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> Tuple[str, Any]:
+        """`(provider, result)` of the first provider whose `start` succeeds."""
+        order = self.state.available()
+        if not order:
+            raise RuntimeError("Every LLM provider's circuit breaker is open")
+        self.state.requests += 1
+        tasks: Dict[asyncio.Task, str] = {}
+
+        async def timed(name: str) -> Any:
+            started = time.perf_counter()
+            try:
+                result = await start(name)
+            except asyncio.CancelledError:
+                self.state.breakers[name].cancel()
+                raise
+            except Exception as e:
+                self.state.failure(name, e)
+                raise
+            self.state.success(name, kind, time.perf_counter() - started)
+            return result
+
+        def launch(name: str, event: str):
+            self.state.breakers[name].begin()
+            self.state.record(name, event)
+            tasks[asyncio.create_task(timed(name))] = name
+
+        launch(order[0], "call")
+        backups = order[1:]
+        deadline: Optional[float] = None
+        if self.hedge_percentile > 0:
+            deadline = self.state.deadline(
+                order[0], kind, self.hedge_percentile, self.hedge_delay
+            )
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=deadline if backups else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    logger.info(f"{order[0]} slower than {deadline:.2f}s, hedging")
+                    launch(backups.pop(0), "hedge")
+                    deadline = None
+                    continue
+                winner = None
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = (name, task.result())
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    self.state.record(winner[0], "win")
+                    return winner
+                if not tasks and backups:
+                    launch(backups.pop(0), "failover")
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        async def call(name: str) -> AIMessage:
+            return await self.models[name].ainvoke(
+                messages, config=ISOLATED, stop=stop, **kwargs
+            )
+
+        _, message = await self._race("response", call)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return asyncio.run(self._agenerate(messages, stop, **kwargs))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async def first_chunk(name: str) -> Tuple[Any, AsyncIterator]:
+            stream = self.models[name].astream(
+                messages, config=ISOLATED, stop=stop, **kwargs
+            )
+            try:
+                return await stream.__anext__(), stream
+            except StopAsyncIteration:
+                return None, stream
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        async def close(result: Tuple[Any, AsyncIterator]):
+            await result[1].aclose()
+
+        name, (chunk, stream) = await self._race("first_token", first_chunk, close)
+        try:
+            while chunk is not None:
+                if isinstance(chunk, AIMessageChunk):
+                    yield ChatGenerationChunk(message=chunk)
+                chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            pass
+        except Exception as e:
+            self.state.failure(name, e)
+            raise
+        finally:
+            await stream.aclose()
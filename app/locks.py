@@ -0,0 +1,60 @@
+import fcntl
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Exclusive advisory lock shared by all processes that see `path`.
+
+    Backed by `flock` on an open descriptor, so the OS releases it when the
+    holder exits or crashes and a stale lock can never block the others.
+    The holder's pid and `owner` are written to the file, so other
+    processes can tell who holds it.
+    """
+
+    def __init__(self, path: Path, owner: str = ""):
+        self.path = Path(path)
+        self.owner = owner
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; False if another process holds it."""
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()} {self.owner}".strip().encode() + b"\n")
+        self._fd = fd
+        return True
+
+    def holder(self) -> Optional[str]:
+        """`owner` written by the current holder, if any."""
+        try:
+            fields = self.path.read_text().split()
+        except FileNotFoundError:
+            return None
+        return fields[1] if len(fields) > 1 else None
+
+    def release(self):
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
@@ -0,0 +1,107 @@
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, RemoveMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from app.concurrency import run_blocking
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadedSqliteSaver(SqliteSaver):
+    """SQLite checkpointer whose async API runs the sync one off the event loop.
+
+    Unlike `AsyncSqliteSaver` it is not tied to the event loop it was
+    created on, so FastAPI's loop and the Streamlit wrappers' per-call
+    loops can share one connection.
+    """
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await run_blocking(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await run_blocking(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ):
+        await run_blocking(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str):
+        await run_blocking(self.delete_thread, thread_id)
+
+
+def open_checkpointer(path: str) -> BaseCheckpointSaver:
+    """Conversation checkpointer at `path`; in-memory if `path` is empty."""
+    if not path:
+        logger.info("Conversation memory is in-process only")
+        return InMemorySaver()
+    os.makedirs(Path(path).parent, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    logger.info(f"Conversation memory persisted to {path}")
+    return ThreadedSqliteSaver(conn)
+
+
+def trim_history(messages: List[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """Newest messages that fit in `max_tokens`, starting at a user turn.
+
+    The latest message is always kept, even if it alone is over budget.
+    """
+    kept = trim_messages(
+        messages,
+        max_tokens=max_tokens,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human",
+        include_system=True,
+    )
+    return kept or messages[-1:]
+
+
+def history_removals(
+    messages: List[BaseMessage], max_tokens: int
+) -> List[RemoveMessage]:
+    """`RemoveMessage`s that drop what `trim_history` would not keep."""
+    kept = {m.id for m in trim_history(messages, max_tokens)}
+    return [RemoveMessage(id=m.id) for m in messages if m.id not in kept]
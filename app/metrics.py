@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "helper_stage_seconds",
+    "Latency of one stage of a chat request",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "helper_request_seconds",
+    "End-to-end latency of a chat request",
+    ["mode", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "helper_admission_queue_depth",
+    "Chat requests waiting for a slot",
+    multiprocess_mode="livesum",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "helper_admission_in_flight",
+    "Chat requests holding a slot",
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "helper_admission_wait_seconds",
+    "Time admitted or timed-out requests spent waiting for a slot",
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "helper_admission_rejected_total",
+    "Chat requests shed with a 429",
+    ["reason"],
+)
+LLM_TOKENS = Counter(
+    "helper_llm_tokens_total",
+    "LLM tokens reported in response metadata",
+    ["kind"],
+)
+LLM_ROUTER_EVENTS = Counter(
+    "helper_llm_router_events_total",
+    "LLM router calls, hedges, failovers, wins, errors and breaker trips",
+    ["provider", "event"],
+)
+CACHE_LOOKUPS = Counter(
+    "helper_cache_lookups_total",
+    "Answer, search and query-embedding cache lookups",
+    ["cache", "result"],
+)
+EMBED_BATCH_SIZE = Histogram(
+    "helper_embed_batch_size",
+    "Distinct queries embedded per batched forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+RETRIEVED_CHUNKS = Histogram(
+    "helper_retrieved_chunks",
+    "Chunks retrieved per offline question",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+SHARD_SEARCHES = Counter(
+    "helper_shard_searches_total",
+    "Offline questions routed to each index shard",
+    ["shard"],
+)
+OUT_OF_SCOPE = Counter(
+    "helper_out_of_scope_total",
+    "Offline questions answered without the LLM because no chunk was relevant",
+)
+CONTEXT_TOKENS = Histogram(
+    "helper_context_tokens",
+    "Estimated tokens of documentation context sent to the LLM",
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 8000),
+)
+
+
+@contextmanager
+def timed(stage: str, trace: Optional["RequestTrace"] = None) -> Iterator[None]:
+    """Observe the duration of a stage, and add it to `trace` if given."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if trace is not None:
+            trace.add(stage, elapsed)
+
+
+class RequestTrace(BaseCallbackHandler):
+    """Timing spans and token counts of one chat request.
+
+    Passed as a LangChain callback, so LLM and tool calls anywhere in the
+    graph (including inside the online agent) are timed without wrapping
+    them. Graph nodes add their own stages through `span`.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.tokens: Dict[str, int] = {}
+        self.fields: Dict[str, Any] = {}
+        self._started = time.perf_counter()
+        self._runs: Dict[UUID, tuple] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    def note(self, **fields: Any):
+        """Extra fields for the request's log line."""
+        self.fields.update(fields)
+
+    def span(self, stage: str):
+        return timed(stage, self)
+
+    def _start(self, run_id: UUID, stage: str):
+        self._runs[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id: UUID):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        stage, started = run
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        self.add(stage, elapsed)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                for kind in ("input_tokens", "output_tokens"):
+                    count = (usage or {}).get(kind, 0)
+                    if count:
+                        LLM_TOKENS.labels(kind.split("_")[0]).inc(count)
+                        self.tokens[kind] = self.tokens.get(kind, 0) + count
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        self._start(run_id, f"tool:{(serialized or {}).get('name', 'unknown')}")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+
+    def finish(self, mode: str, status: str = "ok", **fields: Any):
+        """Record the request latency and log one structured line for it."""
+        total = time.perf_counter() - self._started
+        REQUEST_SECONDS.labels(mode, status).observe(total)
+        logger.info(
+            json.dumps(
+                {
+                    "event": "chat",
+                    "mode": mode,
+                    "status": status,
+                    "total_ms": round(total * 1000, 1),
+                    "spans_ms": {
+                        stage: round(seconds * 1000, 1)
+                        for stage, seconds in self.spans.items()
+                    },
+                    "tokens": self.tokens,
+                    **self.fields,
+                    **fields,
+                }
+            )
+        )
+
+
+def get_trace(config: Dict[str, Any]) -> RequestTrace:
+    """The request trace of a graph run (a throwaway one if there is none)."""
+    return config.get("configurable", {}).get("trace") or RequestTrace()
+
+
+def render() -> tuple:
+    """Prometheus exposition body and content type.
+
+    Aggregates all worker processes when PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,48 @@
+import logging
+from typing import Any, List, Tuple
+
+from langchain_core.documents import Document
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+RERANK_BATCH_SIZE = 32
+OUT_OF_SCOPE_ANSWER = (
+    "I couldn't find anything relevant to this question in the LangGraph and "
+    "LangChain documentation I have. Try rephrasing it, or switch to online "
+    "mode to search the latest docs."
+)
+
+
+def load_cross_encoder(model_name: str, max_tokens: int) -> Any:
+    """Load a cross-encoder on CPU that scores 0-1 relevance (sigmoid of its logit)."""
+    import torch
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(
+        model_name,
+        max_length=max_tokens,
+        device="cpu",
+        default_activation_function=torch.nn.Sigmoid(),
+    )
+
+
+def rerank(
+    model: Any, question: str, docs: List[Document], keep: int, min_score: float
+) -> List[Tuple[Document, float]]:
+    """Best `keep` of `docs` for `question` scoring at least `min_score`."""
+    if not docs:
+        return []
+    scores = model.predict(
+        [(question, doc.page_content) for doc in docs],
+        batch_size=RERANK_BATCH_SIZE,
+        show_progress_bar=False,
+    )
+    ranked = sorted(
+        zip(docs, (float(score) for score in scores)),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return [(doc, score) for doc, score in ranked[:keep] if score >= min_score]
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.admission import QuotaCallback, QuotaTracker
+from app.embedder import BatchingEmbedder
+from app.llm_router import HedgedChatModel
+from app.memory import open_checkpointer
+from app.rerank import load_cross_encoder
+from app.retrieval import IndexRetriever
+from app.utils import get_embeddings
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """Heavy per-process objects, each created once on first use.
+
+    Every resource has its own lock, so loading the embedding model does
+    not hold up a request that only needs an LLM client.
+    """
+
+    def __init__(self):
+        self._resources: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._resources:
+                started = time.perf_counter()
+                self._resources[name] = factory()
+                logger.info(
+                    f"Loaded shared {name} in {time.perf_counter() - started:.2f}s"
+                )
+            return self._resources[name]
+
+    def loaded(self) -> List[str]:
+        return sorted(self._resources)
+
+
+registry = ResourceRegistry()
+
+
+def shared_quota() -> QuotaTracker:
+    return registry.get("quota", QuotaTracker.from_settings)
+
+
+def build_llm(provider: str) -> Any:
+    """Create an LLM client for `provider` from settings.
+
+    Each provider's SDK is imported here, on first use, so the ones that
+    are not configured never cost startup time. Every call the client
+    makes is charged to the shared quota.
+    """
+    callbacks = [QuotaCallback(shared_quota(), provider)]
+    if provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            model=settings.MODEL_NAME,
+            api_key=settings.GOOGLE_API_KEY,
+            temperature=0.2,
+            max_retries=settings.LLM_MAX_RETRIES,
+            callbacks=callbacks,
+        )
+    elif provider == "openrouter":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            model=settings.OPENROUTER_MODEL_NAME,
+            api_key=settings.OPENROUTER_API_KEY,
+            base_url="https://openrouter.ai/api/v1",
+            temperature=0.2,
+            max_retries=settings.LLM_MAX_RETRIES,
+            callbacks=callbacks,
+        )
+    else:
+        raise ValueError(f"Unsupported LLM_PROVIDER={provider}")
+
+
+def build_llm_router(providers: List[str]) -> Any:
+    """One provider's client, or a hedging router over several (first = primary)."""
+    if len(providers) == 1:
+        return build_llm(providers[0])
+    return HedgedChatModel.from_models(
+        {provider: build_llm(provider) for provider in providers},
+        breaker_failures=settings.LLM_BREAKER_FAILURES,
+        breaker_cooldown=settings.LLM_BREAKER_COOLDOWN,
+        hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+        hedge_delay=settings.LLM_HEDGE_DELAY_MS / 1000,
+    )
+
+
+def shared_llm(provider: Optional[str] = None) -> Any:
+    """LLM for `provider`, routed with `LLM_FALLBACK_PROVIDERS` if configured."""
+    provider = provider or settings.LLM_PROVIDER
+    providers = [provider] + [
+        p for p in settings.LLM_FALLBACK_PROVIDERS if p != provider
+    ]
+    return registry.get(
+        f"llm:{'+'.join(providers)}", lambda: build_llm_router(providers)
+    )
+
+
+def shared_embeddings() -> Any:
+    return registry.get("embeddings", lambda: get_embeddings())
+
+
+def query_embedder(embeddings: Any) -> BatchingEmbedder:
+    """`embeddings` behind query batching and caching, sized from settings."""
+    return BatchingEmbedder(
+        embeddings,
+        window_ms=settings.EMBED_BATCH_WINDOW_MS,
+        max_batch=settings.EMBED_BATCH_MAX,
+        cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    )
+
+
+def shared_query_embedder() -> BatchingEmbedder:
+    return registry.get("query_embedder", lambda: query_embedder(shared_embeddings()))
+
+
+def shared_retriever() -> IndexRetriever:
+    return registry.get("retriever", lambda: IndexRetriever(shared_query_embedder()))
+
+
+def shared_checkpointer() -> Any:
+    return registry.get(
+        "checkpointer", lambda: open_checkpointer(settings.CHECKPOINT_PATH)
+    )
+
+
+def shared_reranker() -> Any:
+    return registry.get(
+        "reranker",
+        lambda: load_cross_encoder(settings.RERANK_MODEL, settings.RERANK_MAX_TOKENS),
+    )
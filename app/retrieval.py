@@ -0,0 +1,355 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.concurrency import run_blocking
+from app.dense_index import DenseIndex
+from app.index_store import close_vectorstore, current_version, shard_dirs
+from app.lexical import BM25Index
+from app.metrics import SHARD_SEARCHES
+from app.shards import route_query
+from app.utils import build_vectorstore
+from config import settings
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+RRF_K = 60
+HYBRID_OVERFETCH = 3
+
+
+class Shard:
+    """One source's index: its vector store and (lazily loaded) BM25 index.
+
+    Versions that keep the same shard build share one `Shard`, which is
+    closed when the last version using it is drained.
+    """
+
+    def __init__(self, name: str, path: Path, vectorstore: Any):
+        self.name = name
+        self.path = path
+        self.vectorstore = vectorstore
+        self._users = 0
+        self._users_lock = threading.Lock()
+        self._lexical: Optional[BM25Index] = None
+        self._lexical_loaded = False
+        self._lexical_lock = threading.Lock()
+
+    def lexical(self) -> Optional[BM25Index]:
+        """BM25 index of this shard, loaded on first use (None if absent)."""
+        with self._lexical_lock:
+            if not self._lexical_loaded:
+                self._lexical = BM25Index.load(self.path)
+                self._lexical_loaded = True
+        return self._lexical
+
+    def acquire(self):
+        with self._users_lock:
+            self._users += 1
+
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            if self._users:
+                return
+        close_vectorstore(self.vectorstore)
+        self.vectorstore = None
+        self._lexical = None
+
+
+class _RetrieverHandle:
+    """A served index version and the number of requests still using it."""
+
+    def __init__(self, version: Optional[str], shards: Dict[str, Shard]):
+        self.version = version
+        self.shards = shards
+        self.inflight = 0
+        self.retired = False
+        for shard in shards.values():
+            shard.acquire()
+
+    def route(self, question: str) -> List[Shard]:
+        """Shards to search for `question`, most relevant first."""
+        names = list(self.shards)
+        if settings.SHARD_ROUTING:
+            names = route_query(question, names)
+        for name in names:
+            SHARD_SEARCHES.labels(name).inc()
+        return [self.shards[name] for name in names]
+
+    def close(self):
+        logger.info(f"Drained index version {self.version or 'legacy'}")
+        for shard in self.shards.values():
+            shard.release()
+        self.shards = {}
+
+
+class IndexRetriever:
+    """Serves the published index version and hot-swaps to newer ones."""
+
+    def __init__(self, embeddings: Any):
+        self._embeddings = embeddings
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._handle = self._open(current_version())
+        logger.info("Successfully built VS as retriever")
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._handle.version
+
+    def _open(self, version: Optional[str]) -> _RetrieverHandle:
+        """Open a version, reusing the shards it shares with the served one."""
+        served = getattr(self, "_handle", None)
+        reusable = {s.path: s for s in served.shards.values()} if served else {}
+        shards = {
+            name: reusable.get(path) or self._open_shard(name, path)
+            for name, path in shard_dirs(version).items()
+        }
+        return _RetrieverHandle(version, shards)
+
+    def _open_shard(self, name: str, path: Path) -> Shard:
+        if settings.VECTOR_BACKEND == "dense":
+            dense = DenseIndex.load(path)
+            if dense is not None:
+                return Shard(name, path, dense)
+            logger.warning(f"No dense index in shard {name}, falling back to Chroma")
+        vectorstore = build_vectorstore(
+            persist_directory=path, embeddings=self._embeddings
+        )
+        return Shard(name, path, vectorstore)
+
+    def reload(self) -> bool:
+        """Swap in the published index version if it changed.
+
+        The previous version keeps serving requests that already hold it
+        and is closed once the last of them finishes.
+        """
+        version = current_version()
+        if version == self._handle.version:
+            return False
+
+        with self._reload_lock:
+            if version == self._handle.version:
+                return False
+            logger.info(f"Switching to index version {version}")
+            handle = self._open(version)
+            with self._lock:
+                old, self._handle = self._handle, handle
+                old.retired = True
+                drained = old.inflight == 0
+        if drained:
+            old.close()
+        return True
+
+    @contextmanager
+    def lease(self) -> Iterator[_RetrieverHandle]:
+        """Hold the current index version for the duration of one request."""
+        with self._lock:
+            handle = self._handle
+            handle.inflight += 1
+        try:
+            yield handle
+        finally:
+            with self._lock:
+                handle.inflight -= 1
+                drained = handle.retired and handle.inflight == 0
+            if drained:
+                handle.close()
+
+
+def doc_id(doc: Document) -> str:
+    return doc.id or doc.metadata.get("chunk_id", "")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
+    """Merge ranked id lists; each id scores the sum of `1 / (k + rank)`."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+async def hybrid_search(
+    vectorstore: Any,
+    lexical: Optional[BM25Index],
+    question: str,
+    embedding: List[float],
+    k: int,
+    budget: float,
+) -> List[Document]:
+    """Vector + BM25 search fused by reciprocal rank fusion.
+
+    Both searches over-fetch and run concurrently. Vector results are
+    always used; lexical results only if they arrive within `budget`
+    seconds of the start, otherwise the vector ranking is returned alone.
+    """
+    started = time.perf_counter()
+    candidates = k * HYBRID_OVERFETCH
+    vector_search = run_blocking(
+        vectorstore.similarity_search_by_vector, embedding, k=candidates
+    )
+    if lexical is None:
+        return (await vector_search)[:k]
+
+    lexical_search = asyncio.ensure_future(
+        run_blocking(lexical.search, question, candidates)
+    )
+    vector_docs = await vector_search
+    remaining = budget - (time.perf_counter() - started)
+    try:
+        lexical_hits = await asyncio.wait_for(lexical_search, max(remaining, 0))
+    except asyncio.TimeoutError:
+        logger.warning(f"Lexical search exceeded {budget * 1000:.0f}ms budget")
+        return vector_docs[:k]
+
+    docs = {doc_id(doc): doc for doc in vector_docs}
+    fused = reciprocal_rank_fusion(
+        [list(docs), [chunk_id for chunk_id, _ in lexical_hits]]
+    )[:k]
+    missing = [chunk_id for chunk_id in fused if chunk_id not in docs]
+    if missing:
+        for doc in await run_blocking(vectorstore.get_by_ids, missing):
+            docs[doc_id(doc)] = doc
+    return [docs[chunk_id] for chunk_id in fused if chunk_id in docs]
+
+
+def search_by_vectors(
+    vectorstore: Any, embeddings: List[List[float]], k: int
+) -> List[List[Document]]:
+    """Nearest chunks for many query embeddings in one bulk query."""
+    if hasattr(vectorstore, "similarity_search_by_vectors"):
+        return vectorstore.similarity_search_by_vectors(embeddings, k=k)
+    result = vectorstore._collection.query(
+        query_embeddings=embeddings,
+        n_results=k,
+        include=["documents", "metadatas"],
+    )
+    return [
+        [
+            Document(id=chunk_id, page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(ids, texts, metadatas)
+        ]
+        for ids, texts, metadatas in zip(
+            result["ids"], result["documents"], result["metadatas"]
+        )
+    ]
+
+
+def batch_search(
+    vectorstore: Any,
+    lexical: Optional[BM25Index],
+    questions: List[str],
+    embeddings: List[List[float]],
+    k: int,
+) -> List[List[Document]]:
+    """`hybrid_search` for many questions at once (blocking, no time budget).
+
+    Vector candidates come from one bulk query and chunks that only the
+    lexical side found are fetched with a single `get_by_ids` call.
+    """
+    candidates = k * HYBRID_OVERFETCH if lexical is not None else k
+    vector_docs = search_by_vectors(vectorstore, embeddings, candidates)
+    if lexical is None:
+        return vector_docs
+
+    docs: Dict[str, Document] = {}
+    rankings: List[List[str]] = []
+    for question, hits in zip(questions, vector_docs):
+        docs.update((doc_id(doc), doc) for doc in hits)
+        lexical_ids = [chunk_id for chunk_id, _ in lexical.search(question, candidates)]
+        rankings.append(
+            reciprocal_rank_fusion([[doc_id(doc) for doc in hits], lexical_ids])[:k]
+        )
+    missing = {chunk_id for fused in rankings for chunk_id in fused} - docs.keys()
+    if missing:
+        for doc in vectorstore.get_by_ids(list(missing)):
+            docs[doc_id(doc)] = doc
+    return [
+        [docs[chunk_id] for chunk_id in fused if chunk_id in docs] for fused in rankings
+    ]
+
+
+def merge_shard_results(results: List[List[Document]], k: int) -> List[Document]:
+    """Fuse per-shard rankings by reciprocal rank fusion.
+
+    Results are in routing order, which breaks ties between equal ranks.
+    """
+    if len(results) == 1:
+        return results[0][:k]
+    docs: Dict[str, Document] = {}
+    for ranking in results:
+        for doc in ranking:
+            docs.setdefault(doc_id(doc), doc)
+    fused = reciprocal_rank_fusion([[doc_id(doc) for doc in r] for r in results])
+    return [docs[chunk_id] for chunk_id in fused[:k]]
+
+
+async def search_shards(
+    shards: List[Shard],
+    question: str,
+    embedding: List[float],
+    k: int,
+    budget: float,
+    hybrid: bool = True,
+) -> List[Document]:
+    """`hybrid_search` on each shard in parallel, then merged.
+
+    Each shard is searched on its own, so the cost follows the size of the
+    shards a question is routed to rather than the whole corpus.
+    """
+
+    async def search(shard: Shard) -> List[Document]:
+        lexical = await run_blocking(shard.lexical) if hybrid else None
+        return await hybrid_search(
+            shard.vectorstore, lexical, question, embedding, k, budget
+        )
+
+    results = await asyncio.gather(*(search(shard) for shard in shards))
+    return merge_shard_results(list(results), k)
+
+
+def batch_search_shards(
+    routes: List[List[Shard]],
+    questions: List[str],
+    embeddings: List[List[float]],
+    k: int,
+    hybrid: bool = True,
+) -> List[List[Document]]:
+    """`batch_search` of each shard for the questions routed to it.
+
+    `routes[i]` are the shards of `questions[i]`; every shard runs one bulk
+    query for all of its questions, then results are merged per question.
+    """
+    by_shard: Dict[str, List[int]] = {}
+    shards: Dict[str, Shard] = {}
+    for i, route in enumerate(routes):
+        for shard in route:
+            shards[shard.name] = shard
+            by_shard.setdefault(shard.name, []).append(i)
+
+    hits: Dict[Tuple[int, str], List[Document]] = {}
+    for name, indices in by_shard.items():
+        shard = shards[name]
+        results = batch_search(
+            shard.vectorstore,
+            shard.lexical() if hybrid else None,
+            [questions[i] for i in indices],
+            [embeddings[i] for i in indices],
+            k,
+        )
+        for i, docs in zip(indices, results):
+            hits[i, name] = docs
+    return [
+        merge_shard_results([hits[i, shard.name] for shard in route], k)
+        for i, route in enumerate(routes)
+    ]
@@ -0,0 +1,80 @@
+import logging
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional
+
+from app.lexical import tokenize
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+# Terms that point a question at one library's docs (matched after
+# `tokenize`, so `StateGraph` also counts as `state` and `graph`)
+LIBRARY_TERMS: Dict[str, FrozenSet[str]] = {
+    "langgraph": frozenset(
+        "langgraph graph graphs stategraph node nodes edge edges checkpoint "
+        "checkpoints checkpointer checkpointing interrupt interrupts pregel "
+        "subgraph subgraphs superstep reducer reducers send command thread "
+        "threads durability durable replay travel entrypoint recursion "
+        "breakpoint breakpoints supervisor swarm studio remotegraph toolnode "
+        "workflow workflows".split()
+    ),
+    "langchain": frozenset(
+        "langchain chain chains lcel runnable runnables retriever retrievers "
+        "vectorstore vectorstores loader loaders splitter splitters embeddings "
+        "embedding prompt prompts template templates parser parsers structured "
+        "middleware integration integrations provider providers".split()
+    ),
+}
+# Terms asking for a page or link rather than an explanation
+LINK_TERMS = frozenset(
+    "link links url urls page pages docs documentation reference tutorial "
+    "tutorials guide guides".split()
+)
+
+
+def shard_name(source: str) -> str:
+    """Shard of a source file: `langgraph-llms-full.txt` -> `langgraph-llms-full`."""
+    return Path(source).stem
+
+
+def shard_library(shard: str) -> Optional[str]:
+    library = shard.split("-")[0]
+    return library if library in LIBRARY_TERMS else None
+
+
+def is_link_index(shard: str) -> bool:
+    """Whether a shard is an `llms.txt` link index rather than full docs."""
+    return shard.endswith("-llms")
+
+
+def route_query(question: str, shards: List[str]) -> List[str]:
+    """Shards worth searching for `question`, most relevant first."""
+    terms = set(tokenize(question))
+    scores = {library: len(terms & words) for library, words in LIBRARY_TERMS.items()}
+    best = max(scores.values())
+    libraries = {library for library, score in scores.items() if score == best}
+    wants_links = bool(terms & LINK_TERMS)
+
+    def matches(shard: str, libraries: set, links: bool) -> bool:
+        library = shard_library(shard)
+        return (library is None or library in libraries) and (
+            links or not is_link_index(shard)
+        )
+
+    for candidates, links in (
+        (libraries, wants_links),
+        (set(LIBRARY_TERMS), wants_links),
+        (set(LIBRARY_TERMS), True),
+    ):
+        selected = [shard for shard in shards if matches(shard, candidates, links)]
+        if selected:
+            break
+    return sorted(
+        selected,
+        key=lambda shard: (
+            -scores.get(shard_library(shard) or "", 0),
+            is_link_index(shard),
+        ),
+    )
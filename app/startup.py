@@ -0,0 +1,60 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logging.basicConfig(level=logging.INFO)
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Wall time of each startup phase, and whether warmup has finished.
+
+    Phases run in the lifespan or in the background warmup. A failed phase
+    is recorded (and re-raised), so a process whose warmup failed stays
+    live but reports itself as not ready until a retry of that phase
+    succeeds.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.finished: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished is not None and not self.errors
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+            self.errors.pop(name, None)
+        except Exception as e:
+            logger.error(f"Startup phase {name} failed: {e}")
+            self.errors[name] = str(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = round(elapsed * 1000, 1)
+            logger.info(f"Startup phase {name} took {elapsed:.2f}s")
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        logger.info(f"Startup finished in {self.finished - self.started:.2f}s")
+
+    def report(self) -> Dict[str, Any]:
+        if self.errors:
+            status = "failed" if self.finished is not None else "retrying"
+        else:
+            status = "ready" if self.ready else "warming_up"
+        report: Dict[str, Any] = {"status": status, "phases_ms": self.phases}
+        if self.finished is not None:
+            report["total_ms"] = round((self.finished - self.started) * 1000, 1)
+        if self.errors:
+            report["errors"] = self.errors
+        return report
@@ -1,9 +1,13 @@
 import logging
-from typing import List
+import threading
+from typing import Any, Dict, List, Optional
 
-from langchain_community.tools.tavily_search import TavilySearchResults
+import requests
 from langchain_core.tools import tool
+from requests.adapters import HTTPAdapter
 
+from app.cache import TTLCache, normalize_question
+from app.metrics import CACHE_LOOKUPS
 from config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -11,17 +15,94 @@ logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger(__name__)
 
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+
+class TavilySearchClient:
+    """Tavily search over one pool of keep-alive connections, with a TTL cache.
+
+    Repeated queries (after normalization) are answered from the cache and
+    do not count against the Tavily quota. `requests.Session` is not
+    thread-safe, so each thread gets its own, all sharing one adapter
+    (connection pool).
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        max_results: int = 5,
+        search_depth: str = "advanced",
+        include_answer: bool = True,
+    ):
+        self.api_key = api_key
+        self.max_results = max_results
+        self.search_depth = search_depth
+        self.include_answer = include_answer
+        self.cache = TTLCache(settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL)
+        self._adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.SEARCH_POOL_SIZE
+        )
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's session."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.headers["Authorization"] = f"Bearer {self.api_key}"
+        return session
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        key = normalize_question(query)
+        cached = self.cache.get(key)
+        CACHE_LOOKUPS.labels("search", "miss" if cached is None else "hit").inc()
+        if cached is not None:
+            logger.info("Search cache hit")
+            return cached
+
+        response = self.session.post(
+            TAVILY_SEARCH_URL,
+            json={
+                "query": query,
+                "max_results": self.max_results,
+                "search_depth": self.search_depth,
+                "include_answer": self.include_answer,
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+        data = response.json()
+        results = [
+            {"url": r.get("url"), "content": r.get("content")}
+            for r in data.get("results", [])
+        ]
+        if data.get("answer"):
+            results.insert(0, {"url": "tavily:answer", "content": data["answer"]})
+        self.cache.set(key, results)
+        return results
+
+
+_search_client: Optional[TavilySearchClient] = None
+_search_client_lock = threading.Lock()
+
+
+def get_search_client() -> TavilySearchClient:
+    """Process-wide Tavily client, created on first use."""
+    global _search_client
+    with _search_client_lock:
+        if _search_client is None:
+            _search_client = TavilySearchClient(api_key=settings.TAVILY_API_KEY)
+        return _search_client
+
 
 @tool
-def search_langchain_docs(query: str) -> str:
+def search_langchain_docs(query: str) -> List[Dict[str, Any]]:
     """Search for latest LangChain/LangGraph information online."""
-    logger.info(f"Calling search docs tool with query: {query}")
-    return TavilySearchResults(
-        max_results=5,
-        search_depth="advanced",
-        include_answer=True,
-        api_key=settings.TAVILY_API_KEY,
-    ).invoke(query)
+    if settings.LOG_PAYLOADS:
+        logger.info(f"Calling search docs tool with query: {query}")
+    return get_search_client().search(query)
 
 
 def get_online_tools() -> List:
@@ -1,53 +1,174 @@
+import hashlib
+import json
 import logging
 import os
+from bisect import bisect_right
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Iterator, List, Optional, Tuple
 
-from langchain_chroma import Chroma
-from langchain_community.document_loaders import TextLoader
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from app.index_store import current_index_dir
+
 logging.basicConfig(level=logging.INFO)
 
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+COLLECTION_NAME = "langgraph_docs"
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+SEPARATORS = ["\n\n", "\n## ", "\n### ", "\n- ", "\n1. "]
+SECTION_TARGET_CHARS = 4_000
+SECTION_MAX_CHARS = 16_000
 
-def load_docs(paths: list[str]):
-    logger.info(f"Loading docs from paths: {paths}")
-    docs = []
+
+def splitter_fingerprint() -> str:
+    """Hash of everything that decides how text maps to embedded chunks."""
+    config = {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "separators": SEPARATORS,
+        "section_target_chars": SECTION_TARGET_CHARS,
+        "section_max_chars": SECTION_MAX_CHARS,
+        "embedding_model": EMBEDDING_MODEL,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def chunk_id(source: str, content: str, fingerprint: Optional[str] = None) -> str:
+    """Stable id of a chunk, derived from its source, text and splitter config."""
+    digest = hashlib.sha256()
+    for part in (fingerprint or splitter_fingerprint(), source, content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _iter_sections(path: str) -> Iterator[Tuple[str, int, List[Tuple[int, str]]]]:
+    """Stream a file as `(text, start_byte, headings)` sections.
+
+    The file is read line by line. A section ends at a top-level `# `
+    heading once it holds a full chunk, at any heading once it holds
+    `SECTION_TARGET_CHARS`, or at a blank line once it holds
+    `SECTION_MAX_CHARS`. Lines inside fenced code
+    blocks never count as headings. `headings` lists `(char_offset, title)`
+    pairs within the section, starting with the heading carried over from
+    the previous section.
+    """
+    lines: List[str] = []
+    headings: List[Tuple[int, str]] = []
+    size = start = offset = 0
+    in_fence = False
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.decode("utf-8", errors="replace")
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+            is_heading = (
+                not in_fence
+                and line.startswith("#")
+                and line.lstrip("#").startswith(" ")
+            )
+            min_size = CHUNK_SIZE if line.startswith("# ") else SECTION_TARGET_CHARS
+            starts_section = is_heading and size >= min_size
+            if lines and (
+                starts_section
+                or (size >= SECTION_MAX_CHARS and not line.strip())
+                or size >= 2 * SECTION_MAX_CHARS
+            ):
+                yield "".join(lines), start, headings
+                headings = [(0, headings[-1][1])] if headings else []
+                lines, size, start = [], 0, offset
+            if is_heading:
+                headings.append((size, line.strip().lstrip("#").strip()))
+            lines.append(line)
+            size += len(line)
+            offset += len(raw)
+    if lines:
+        yield "".join(lines), start, headings
+
+
+def iter_chunks(paths: List[str]) -> Iterator[Document]:
+    """Lazily load and split docs, one section at a time.
+
+    Chunks carry `source`, `chunk_id`, the `heading` in effect at their
+    start (or the first one inside them) and the `start_byte`/`end_byte`
+    of their text within the source file.
+    """
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=100,
-        separators=["\n\n", "\n## ", "\n### ", "\n- ", "\n1. "],
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=SEPARATORS,
     )
+    fingerprint = splitter_fingerprint()
     for path in paths:
-        if os.path.exists(path):
-            loader = TextLoader(path, encoding="utf-8")
-            raw_docs = loader.load()
-            for doc in raw_docs:
-                doc.metadata["source"] = Path(path).name
-            chunks = splitter.split_documents(raw_docs)
-            docs.extend(chunks)
-        else:
+        if not os.path.exists(path):
             logger.warning(f"Missing file: {path}")
+            continue
+        source = Path(path).name
+        for text, start_byte, headings in _iter_sections(path):
+            heading_offsets = [pos for pos, _ in headings]
+            cursor = 0
+            for content in splitter.split_text(text):
+                pos = text.find(content, cursor)
+                if pos == -1:
+                    pos = cursor
+                cursor = pos + 1
+                chunk_start = start_byte + len(text[:pos].encode("utf-8"))
+                index = bisect_right(heading_offsets, pos) - 1
+                if index < 0 and heading_offsets:
+                    index = 0 if heading_offsets[0] < pos + len(content) else -1
+                yield Document(
+                    page_content=content,
+                    metadata={
+                        "source": source,
+                        "chunk_id": chunk_id(source, content, fingerprint),
+                        "heading": headings[index][1] if index >= 0 else "",
+                        "start_byte": chunk_start,
+                        "end_byte": chunk_start + len(content.encode("utf-8")),
+                    },
+                )
+
 
-    logger.info(f"Succesfully loaded docs")
+def load_docs(paths: list[str]):
+    logger.info(f"Loading docs from paths: {paths}")
+    docs = list(iter_chunks(paths))
+    logger.info(f"Succesfully loaded {len(docs)} chunks")
     return docs
 
 
-def build_vectorstore(docs: Optional[List] = None) -> Chroma:
-    """Build Chroma vectorstore."""
-    persist_directory = "vectorstore/chroma"
-    os.makedirs(persist_directory, exist_ok=True)
+def get_embeddings() -> Any:
+    """Load the sentence-transformers embedding model."""
+    from langchain_huggingface import HuggingFaceEmbeddings
 
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
         model_kwargs={"device": "cpu"},
     )
 
-    logger.info("Building vector store")
+
+def build_vectorstore(
+    docs: Optional[List] = None,
+    persist_directory: Optional[Path] = None,
+    embeddings: Optional[Any] = None,
+) -> Any:
+    """Build Chroma vectorstore.
+
+    Opens the currently published index unless `persist_directory` is given.
+    Pass `embeddings` to reuse an already loaded model.
+    """
+    from langchain_chroma import Chroma
+
+    persist_directory = str(persist_directory or current_index_dir())
+    os.makedirs(persist_directory, exist_ok=True)
+
+    if embeddings is None:
+        embeddings = get_embeddings()
+
+    logger.info(f"Building vector store at {persist_directory}")
 
     if docs:
         logger.info(f"Building Chroma with {len(docs)} docs")
@@ -55,14 +176,14 @@ def build_vectorstore(docs: Optional[List] = None) -> Chroma:
             documents=docs,
             embedding=embeddings,
             persist_directory=persist_directory,
-            collection_name="langgraph_docs",
+            collection_name=COLLECTION_NAME,
         )
         logger.info(f"Successfully built vector store with {len(docs)} docs")
     else:
         vectorstore = Chroma(
             persist_directory=persist_directory,
             embedding_function=embeddings,
-            collection_name="langgraph_docs",
+            collection_name=COLLECTION_NAME,
         )
         count = vectorstore._collection.count()
         logger.info(f"Loaded existing vector store with {count} docs")
@@ -0,0 +1,74 @@
+"""Concurrent offline chats against one HelperAgent, with a fake LLM.
+
+Compares an async-native LLM client with a blocking one (run through the
+default thread pool) to show how many requests a single worker keeps in
+flight. Usage:
+
+    python -m benchmarks.bench_concurrency --requests 300 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.fakes import FakeChatModel, fake_embeddings, workspace
+
+DATA_PATHS = ["data/langgraph-llms.txt"]
+
+
+async def _run(agent, requests: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    peak_threads = threading.active_count()
+
+    async def one(i: int):
+        started = time.perf_counter()
+        await agent.achat([{"role": "user", "content": f"question {i}"}])
+        latencies.append(time.perf_counter() - started)
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample_threads())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+    sampler.cancel()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(requests / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+        "peak_threads": peak_threads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    from app.agent import HelperAgent
+    from app.cache import AnswerCache
+    from config import settings
+
+    settings.LLM_MAX_CONCURRENCY[settings.LLM_PROVIDER] = args.requests
+    with workspace(DATA_PATHS):
+        for name, async_native in (("blocking", False), ("async", True)):
+            llm = FakeChatModel(latency=args.latency, async_native=async_native)
+            agent = HelperAgent(llm=llm, embeddings=fake_embeddings())
+            agent.answer_cache = AnswerCache(maxsize=0, ttl=0, threshold=1.0)
+            print(name, asyncio.run(_run(agent, args.requests)))
+
+
+if __name__ == "__main__":
+    main()
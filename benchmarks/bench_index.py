@@ -0,0 +1,158 @@
+"""Cold start, memory and query latency of the Chroma vs dense index backends.
+
+Builds a fake-embedded index of the bundled `data/` corpus, then opens it
+in a fresh process per backend (Chroma, dense float32, dense int8) so each
+measurement starts cold. Top-k agreement is reported against Chroma.
+Usage:
+
+    python -m benchmarks.bench_index --queries 200 --k 4
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.fakes import REPO_ROOT, fake_embeddings, workspace
+
+DATA_PATHS = ["data/langgraph-llms-full.txt", "data/langgraph-llms.txt"]
+BACKENDS = ("chroma", "dense-float32", "dense-int8")
+
+
+def _rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(backend: str, index_dir: str, queries: int, k: int):
+    """Open one backend and time it; prints a JSON result line."""
+    embedder = fake_embeddings()
+    vectors = [embedder.embed_query(f"question {i}") for i in range(queries)]
+    rss_before = _rss_mb()
+
+    started = time.perf_counter()
+    if backend == "chroma":
+        from app.utils import build_vectorstore
+
+        store = build_vectorstore(
+            persist_directory=Path(index_dir), embeddings=embedder
+        )
+        store.similarity_search_by_vector(vectors[0], k=k)
+    else:
+        from app.dense_index import DenseIndex
+
+        store = DenseIndex.load(Path(index_dir))
+    open_s = time.perf_counter() - started
+
+    latencies: List[float] = []
+    results: List[List[str]] = []
+    for vector in vectors:
+        started = time.perf_counter()
+        docs = store.similarity_search_by_vector(vector, k=k)
+        latencies.append(time.perf_counter() - started)
+        results.append([doc.id for doc in docs])
+
+    latencies.sort()
+    print(
+        json.dumps(
+            {
+                "backend": backend,
+                "open_ms": round(open_s * 1000, 1),
+                "p50_ms": round(statistics.median(latencies) * 1000, 3),
+                "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+                "rss_added_mb": round(_rss_mb() - rss_before, 1),
+                "results": results,
+            }
+        )
+    )
+
+
+def _run_child(backend: str, index_dir: Path, queries: int, k: int) -> Dict[str, Any]:
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_index",
+            "--child",
+            backend,
+            str(index_dir),
+            "--queries",
+            str(queries),
+            "--k",
+            str(k),
+        ],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _disk_mb(path: Path, pattern: str) -> float:
+    return round(sum(p.stat().st_size for p in path.rglob(pattern)) / 2**20, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "INDEX_DIR"))
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child, args.queries, args.k)
+        return
+
+    from langchain_chroma import Chroma
+
+    from app.dense_index import write_dense_index
+    from app.index_store import current_shard_dirs
+    from app.utils import COLLECTION_NAME
+
+    with workspace(DATA_PATHS) as tmp, tempfile.TemporaryDirectory() as int8_dir:
+        # The largest shard: backends are compared on one collection
+        index_dir = max(
+            ((tmp / path).resolve() for path in current_shard_dirs().values()),
+            key=lambda path: _disk_mb(path, "dense_vectors.npy"),
+        )
+        collection = Chroma(
+            persist_directory=str(index_dir), collection_name=COLLECTION_NAME
+        )._collection
+        write_dense_index(collection, Path(int8_dir), dtype="int8")
+        dirs = {
+            "chroma": index_dir,
+            "dense-float32": index_dir,
+            "dense-int8": Path(int8_dir),
+        }
+        sizes = {
+            "chroma": _disk_mb(index_dir, "*.sqlite3") + _disk_mb(index_dir, "*.bin"),
+            "dense-float32": _disk_mb(index_dir, "dense_*"),
+            "dense-int8": _disk_mb(Path(int8_dir), "dense_*"),
+        }
+        runs = {b: _run_child(b, dirs[b], args.queries, args.k) for b in BACKENDS}
+
+    reference = runs["chroma"].pop("results")
+    print(f"{len(reference)} queries, k={args.k}")
+    for backend in BACKENDS:
+        run = runs[backend]
+        results = run.pop("results", reference)
+        overlap = statistics.mean(
+            len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(results, reference)
+        )
+        run.update(disk_mb=sizes[backend], topk_agreement=round(overlap, 3))
+        print(json.dumps(run))
+
+
+if __name__ == "__main__":
+    main()
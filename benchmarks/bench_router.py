@@ -0,0 +1,102 @@
+"""Hedged LLM routing against fake providers with injected tails and failures.
+
+Each scenario runs the same calls through the primary alone and through a
+`HedgedChatModel` over primary + secondary, and reports latency, errors and
+the router's hedge and win rates. Usage:
+
+    python -m benchmarks.bench_router --requests 400 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from app.llm_router import HedgedChatModel
+from benchmarks.fakes import FakeChatModel
+
+SCENARIOS = {
+    # Primary is faster, but 5% of its calls hit a 3s tail
+    "tail": (
+        {"latency": 0.2, "slow_rate": 0.05, "slow_latency": 3.0},
+        {"latency": 0.3},
+    ),
+    # Primary is down: every call fails
+    "outage": ({"latency": 0.2, "failure_rate": 1.0}, {"latency": 0.3}),
+    # Primary is flaky and slow in the tail
+    "flaky": (
+        {"latency": 0.2, "failure_rate": 0.1, "slow_rate": 0.05, "slow_latency": 3.0},
+        {"latency": 0.3},
+    ),
+}
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return round(samples[min(int(len(samples) * q), len(samples) - 1)] * 1000, 1)
+
+
+async def _run(model: Any, requests: int, concurrency: int, stream: bool):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if stream:
+                    async for _ in model.astream(f"question {i}"):
+                        break
+                else:
+                    await model.ainvoke(f"question {i}")
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return {
+        "wall_s": round(time.perf_counter() - started, 2),
+        "errors": errors,
+        "p50_ms": _percentile(latencies, 0.5) if latencies else None,
+        "p99_ms": _percentile(latencies, 0.99) if latencies else None,
+    }
+
+
+def run_scenario(
+    name: str, requests: int, concurrency: int, hedge_delay: float, stream: bool
+) -> Dict[str, Any]:
+    primary, secondary = SCENARIOS[name]
+    random.seed(0)
+    single = asyncio.run(_run(FakeChatModel(**primary), requests, concurrency, stream))
+    random.seed(0)
+    router = HedgedChatModel.from_models(
+        {"primary": FakeChatModel(**primary), "secondary": FakeChatModel(**secondary)},
+        hedge_delay=hedge_delay,
+    )
+    hedged = asyncio.run(_run(router, requests, concurrency, stream))
+    return {"primary_only": single, "hedged": hedged, "router": router.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--hedge-delay", type=float, default=1.0)
+    parser.add_argument("--stream", action="store_true", help="time to first token")
+    args = parser.parse_args()
+
+    for name in SCENARIOS:
+        result = run_scenario(
+            name, args.requests, args.concurrency, args.hedge_delay, args.stream
+        )
+        print(name, json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Deterministic stand-ins for the LLM, search tool and embedding model.
+
+Benchmarks use these so they run offline, without API keys, and measure
+the app's own overhead rather than provider latency noise.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+EMBEDDING_SIZE = 384
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that returns a fixed answer after `latency` seconds.
+
+    With `async_native=False` only the sync path is implemented, so async
+    callers fall back to LangChain's default of running it in a thread
+    pool - the way a blocking client behaves under load. Once tools are
+    bound it first calls the first tool with the user's question (saying
+    `narration` first, if set), then answers after the tool result. Usage metadata is estimated from text
+    length so token accounting has something to count.
+
+    A `slow_rate` share of calls take `slow_latency` instead (a tail), and
+    a `failure_rate` share raise, to exercise hedging and failover.
+    Streaming waits the latency before the first token.
+    """
+
+    answer: str = "Use a checkpointer when compiling the graph."
+    latency: float = 0.5
+    slow_rate: float = 0.0
+    slow_latency: float = 5.0
+    failure_rate: float = 0.0
+    async_native: bool = True
+    tool_name: Optional[str] = None
+    narration: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-delayed"
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any) -> "FakeChatModel":
+        name = getattr(tools[0], "name", None) if tools else None
+        return self.model_copy(update={"tool_name": name})
+
+    def _delay(self) -> float:
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Injected provider failure")
+        if random.random() < self.slow_rate:
+            return self.slow_latency
+        return self.latency
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        if self.tool_name and not isinstance(messages[-1], ToolMessage):
+            message = AIMessage(
+                self.narration,
+                tool_calls=[
+                    {
+                        "name": self.tool_name,
+                        "args": {"query": str(messages[-1].content)},
+                        "id": f"call_{len(messages)}",
+                    }
+                ],
+            )
+        else:
+            message = AIMessage(self.answer)
+        output_tokens = len(self.answer) // 4
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._delay())
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if not self.async_native:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        await asyncio.sleep(self._delay())
+        return self._result(messages)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        delay = self._delay()
+        if self.async_native:
+            await asyncio.sleep(delay)
+        else:
+            await asyncio.to_thread(time.sleep, delay)
+        message = self._result(messages).generations[0].message
+        if message.tool_calls:
+            if message.content:
+                yield ChatGenerationChunk(
+                    message=AIMessageChunk(content=message.content)
+                )
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {**call, "args": json.dumps(call["args"]), "index": i}
+                        for i, call in enumerate(message.tool_calls)
+                    ],
+                    usage_metadata=message.usage_metadata,
+                )
+            )
+            return
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=word if last else word + " ",
+                    usage_metadata=message.usage_metadata if last else None,
+                )
+            )
+
+
+class FakeSearchClient:
+    """Drop-in for `TavilySearchClient` that answers after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.3):
+        self.latency = latency
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        time.sleep(self.latency)
+        return [
+            {"url": "tavily:answer", "content": f"Fake answer about {query}."},
+            {"url": "https://docs.langchain.com/fake", "content": "Fake result."},
+        ]
+
+
+class UnitFakeEmbedding(DeterministicFakeEmbedding):
+    """Deterministic fake embeddings, L2-normalized like all-MiniLM-L6-v2's."""
+
+    def _get_embedding(self, seed: int) -> List[float]:
+        vector = super()._get_embedding(seed)
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+
+def fake_embeddings() -> UnitFakeEmbedding:
+    return UnitFakeEmbedding(size=EMBEDDING_SIZE)
+
+
+@contextmanager
+def scratch_dir() -> Iterator[Path]:
+    """Temporary working directory that sees the repo's `data/`.
+
+    The app resolves `data/` and `vectorstore/` relative to the cwd, so
+    benchmarks run inside the temp dir and never touch the real index.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="helper-bench-") as tmp:
+        os.symlink(REPO_ROOT / "data", Path(tmp) / "data")
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(cwd)
+
+
+@contextmanager
+def workspace(data_paths: List[str]) -> Iterator[Path]:
+    """`scratch_dir` with published fake-embedded shards of `data_paths`."""
+    from app.index_store import publish_shards
+    from app.ingest import sync_shards
+
+    with scratch_dir() as tmp:
+        shards, _ = sync_shards(data_paths, {}, embeddings=fake_embeddings(), workers=1)
+        publish_shards(shards)
+        yield tmp
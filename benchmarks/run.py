@@ -0,0 +1,383 @@
+"""End-to-end benchmark suite: ingestion, retrieval, and /chat under load.
+
+Runs offline against the bundled `data/` corpus with fake LLM, search and
+embedding stand-ins (`--real-embeddings` uses the sentence-transformers
+model, which makes the retrieval quality numbers meaningful for the vector
+side). Results go to a JSON file; pass an earlier one as `--baseline` to
+compare. Usage:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --output new.json --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fakes import (
+    REPO_ROOT,
+    FakeChatModel,
+    FakeSearchClient,
+    fake_embeddings,
+    scratch_dir,
+)
+
+DATA_PATHS = [
+    "data/langgraph-llms.txt",
+    "data/langgraph-llms-full.txt",
+    "data/langchain-llms.txt",
+]
+QUESTIONS_PATH = Path(__file__).with_name("questions.json")
+HIGHER_IS_BETTER = ("per_s", "rps", "recall_at_k", "mrr")
+LOWER_IS_BETTER = ("_ms", "_s")
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(samples[min(int(len(samples) * q), len(samples) - 1)] * 1000, 3)
+
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+def load_questions() -> List[Dict[str, Any]]:
+    """Questions with the strings that mark a retrieved chunk as relevant."""
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_relevant(text: str, relevant: List[str]) -> bool:
+    lowered = text.lower()
+    return any(term.lower() in lowered for term in relevant)
+
+
+def bench_ingest(embeddings: Any) -> Dict[str, float]:
+    """Chunk the corpus and embed every chunk into freshly published shards."""
+    from app.index_store import publish_shards
+    from app.ingest import sync_shards
+    from app.utils import load_docs
+
+    started = time.perf_counter()
+    chunks = len(load_docs(DATA_PATHS))
+    chunk_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    shards, _ = sync_shards(DATA_PATHS, {}, embeddings=embeddings, workers=1)
+    publish_shards(shards)
+    index_s = time.perf_counter() - started
+    return {
+        "chunks": chunks,
+        "shards": len(shards),
+        "chunk_s": round(chunk_s, 3),
+        "chunks_chunked_per_s": round(chunks / chunk_s, 1),
+        "index_s": round(index_s, 3),
+        "chunks_indexed_per_s": round(chunks / index_s, 1),
+    }
+
+
+def bench_retrieval(embeddings: Any, k: int, repeats: int) -> Dict[str, Any]:
+    """Latency and quality (recall@k, MRR) of each retrieval configuration.
+
+    Vector and hybrid search run over every shard and, as `-routed`, over
+    the shards the query classifier picks; `searched_fraction` is the
+    share of all chunks held by the shards searched.
+    """
+    from app.dense_index import DenseIndex
+    from app.index_store import current_shard_dirs
+    from app.retrieval import Shard, reciprocal_rank_fusion
+    from app.utils import build_vectorstore
+
+    questions = load_questions()
+    shard_dirs = current_shard_dirs()
+    stores = {
+        "chroma": {
+            name: Shard(
+                name,
+                path,
+                build_vectorstore(persist_directory=path, embeddings=embeddings),
+            )
+            for name, path in shard_dirs.items()
+        },
+        "dense": {
+            name: Shard(name, path, DenseIndex.load(path))
+            for name, path in shard_dirs.items()
+        },
+    }
+    dense = stores["dense"]
+
+    started = time.perf_counter()
+    vectors = embeddings.embed_documents([q["question"] for q in questions])
+    results: Dict[str, Any] = {
+        "questions": len(questions),
+        "k": k,
+        "embed_per_s": round(len(questions) / (time.perf_counter() - started), 1),
+    }
+
+    sizes = {name: len(shard.vectorstore) for name, shard in dense.items()}
+    chunk_texts = {
+        doc.id: doc.page_content
+        for shard in dense.values()
+        for doc in shard.vectorstore.get_by_ids(shard.lexical().ids)
+    }
+
+    def bm25(question: str, _: List[float]) -> Tuple[List[str], List[str]]:
+        rankings = [
+            [chunk_id for chunk_id, _ in shard.lexical().search(question, k)]
+            for shard in dense.values()
+        ]
+        fused = reciprocal_rank_fusion(rankings)[:k]
+        return [chunk_texts[chunk_id] for chunk_id in fused], list(dense)
+
+    configs: Dict[str, Callable] = {"bm25": bm25}
+    for name, shards in stores.items():
+        for mode in ("vector", "hybrid"):
+            for routed in (False, True):
+                config = f"{mode}-{name}{'-routed' if routed else ''}"
+                configs[config] = _searcher(shards, mode == "hybrid", routed, k)
+
+    for name, search in configs.items():
+        latencies: List[float] = []
+        searched: List[float] = []
+        hits, reciprocal_ranks = 0, []
+        for _ in range(repeats):
+            for q, vector in zip(questions, vectors):
+                started = time.perf_counter()
+                texts, shard_names = search(q["question"], vector)
+                latencies.append(time.perf_counter() - started)
+                searched.append(
+                    sum(sizes[s] for s in shard_names) / sum(sizes.values())
+                )
+                ranks = [
+                    rank
+                    for rank, text in enumerate(texts, start=1)
+                    if is_relevant(text, q["relevant"])
+                ]
+                hits += bool(ranks)
+                reciprocal_ranks.append(1 / ranks[0] if ranks else 0.0)
+        results[name] = {
+            **_percentiles(latencies),
+            "recall_at_k": round(hits / len(latencies), 3),
+            "mrr": round(statistics.mean(reciprocal_ranks), 3),
+            "searched_fraction": round(statistics.mean(searched), 3),
+        }
+    return results
+
+
+def _searcher(shards: Dict[str, Any], hybrid: bool, routed: bool, k: int) -> Callable:
+    from app.retrieval import search_shards
+    from app.shards import route_query
+
+    loop = asyncio.new_event_loop()
+
+    def search(question: str, vector: List[float]) -> Tuple[List[str], List[str]]:
+        names = route_query(question, list(shards)) if routed else list(shards)
+        docs = loop.run_until_complete(
+            search_shards(
+                [shards[name] for name in names],
+                question,
+                vector,
+                k,
+                budget=10,
+                hybrid=hybrid,
+            )
+        )
+        return [doc.page_content for doc in docs], names
+
+    return search
+
+
+async def _load(
+    client: Any, mode: str, requests: int, concurrency: int
+) -> Dict[str, float]:
+    questions = load_questions()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        body = {
+            "mode": mode,
+            "messages": [
+                {"role": "user", "content": questions[i % len(questions)]["question"]}
+            ],
+        }
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/chat", json=body)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / wall, 1),
+        **_percentiles(latencies),
+    }
+
+
+def bench_chat(
+    embeddings: Any, requests: int, concurrency: int, latency: float
+) -> Dict[str, Any]:
+    """Concurrent `/chat` load through the FastAPI app, per mode."""
+    import httpx
+    from fastapi import FastAPI
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    import app.tools
+    from api.routes import router
+    from app.admission import AdmissionController
+    from app.agent import HelperAgent
+    from app.cache import AnswerCache
+    from config import settings
+
+    settings.LLM_MAX_CONCURRENCY[settings.LLM_PROVIDER] = concurrency
+    # One simulated client sends everything: measure capacity, not its rate limit
+    settings.CLIENT_RATE_PER_MINUTE = 0
+    app.tools._search_client = FakeSearchClient(latency=latency)
+    api = FastAPI()
+    api.include_router(router)
+    api.state.helper_agent = HelperAgent(
+        llm=FakeChatModel(latency=latency),
+        embeddings=embeddings,
+        mode="offline",
+        checkpointer=InMemorySaver(),
+    )
+    api.state.helper_agent.answer_cache = AnswerCache(maxsize=0, ttl=0, threshold=1)
+    api.state.admission = AdmissionController.from_settings()
+
+    async def run() -> Dict[str, Any]:
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=300
+        ) as client:
+            return {
+                mode: await _load(client, mode, requests, concurrency)
+                for mode in ("offline", "online")
+            }
+
+    return asyncio.run(run())
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def _direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None if not compared."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf.endswith(HIGHER_IS_BETTER):
+        return 1
+    if leaf.endswith(LOWER_IS_BETTER):
+        return -1
+    return None
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Print changes against `baseline`; return the regressed metrics."""
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    print(f"{'metric':55} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric, value in current.items():
+        direction = _direction(metric)
+        before = previous.get(metric)
+        if direction is None or not before:
+            continue
+        change = (value - before) / abs(before)
+        regressed = change * direction < -tolerance
+        if regressed:
+            regressions.append(metric)
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:55} {before:>12} {value:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=Path("bench.json"))
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--real-embeddings", action="store_true")
+    args = parser.parse_args()
+    output, baseline = args.output.resolve(), args.baseline
+    baseline = baseline.resolve() if baseline else None
+
+    if args.real_embeddings:
+        from app.utils import get_embeddings
+
+        embeddings = get_embeddings()
+    else:
+        embeddings = fake_embeddings()
+
+    with scratch_dir():
+        results = {"ingest": bench_ingest(embeddings)}
+        results["retrieval"] = bench_retrieval(embeddings, args.k, args.repeats)
+        results["chat"] = bench_chat(
+            embeddings, args.requests, args.concurrency, args.latency
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "embeddings": "real" if args.real_embeddings else "fake",
+            "args": {k: str(v) for k, v in vars(args).items()},
+        },
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,6 +12,51 @@ class Settings(BaseSettings):
     OPENROUTER_MODEL_NAME: str = "google/gemini-2.5-flash-lite"
     TAVILY_API_KEY: str | None = None
     DATA_REFRESH_FREQ: str = "weekly"
+    INDEX_POLL_SECONDS: int = 30
+    STARTUP_WARMUP: bool = True
+    INGEST_BATCH_SIZE: int = 256
+    INGEST_WORKERS: int = 0
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_TTL: float = 24 * 3600
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    RETRIEVAL_WORKERS: int = 8
+    RETRIEVAL_K: int = 4
+    EMBED_BATCH_WINDOW_MS: float = 5
+    EMBED_BATCH_MAX: int = 32
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    HYBRID_RETRIEVAL: bool = True
+    SHARD_ROUTING: bool = True
+    VECTOR_BACKEND: str = "chroma"
+    DENSE_INDEX_DTYPE: str = "float32"
+    RETRIEVAL_BUDGET_MS: int = 250
+    CONTEXT_TOKEN_BUDGET: int = 1500
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20
+    RERANK_MIN_SCORE: float = 0.1
+    RERANK_MAX_TOKENS: int = 256
+    CHECKPOINT_PATH: str = "checkpoints/threads.sqlite"
+    HISTORY_TOKEN_BUDGET: int = 2000
+    BATCH_CONCURRENCY: int = 16
+    LOG_PAYLOADS: bool = False
+    SEARCH_CACHE_SIZE: int = 256
+    SEARCH_CACHE_TTL: float = 6 * 3600
+    SEARCH_POOL_SIZE: int = 16
+    LLM_MAX_CONCURRENCY: Dict[str, int] = {"gemini": 32, "openrouter": 32}
+    LLM_FALLBACK_PROVIDERS: List[str] = []
+    LLM_HEDGE_PERCENTILE: float = 95
+    LLM_HEDGE_DELAY_MS: int = 3000
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_COOLDOWN: float = 30
+    LLM_MAX_RETRIES: int = 1
+    LLM_QUOTA_RPM: Dict[str, int] = {}
+    LLM_QUOTA_RPD: Dict[str, int] = {}
+    LLM_RATE_LIMIT_COOLDOWN: float = 60
+    ADMISSION_MAX_CONCURRENT: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_QUEUE_TIMEOUT: float = 10
+    CLIENT_RATE_PER_MINUTE: float = 60
+    CLIENT_BURST: int = 20
 
     class Config:
         env_file = ".env"
@@ -1,11 +1,16 @@
 import logging
+import threading
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.concurrency import asynccontextmanager
 
 from api.routes import router as chat_router
+from app.admission import AdmissionController
 from app.agent import HelperAgent
 from app.data_refresh import DataRefresher
+from app.metrics import render
+from app.resources import registry, shared_quota
+from app.startup import StartupProfile
 from config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -19,13 +24,34 @@ data_refresher: DataRefresher = None
 async def lifespan(app: FastAPI):
     global data_refresher
     logger.info(f"Starting FastAPI with AGENT_MODE={settings.AGENT_MODE}")
-    app.state.helper_agent = HelperAgent()
-    data_refresher = DataRefresher()
-    await data_refresher.start()
+    startup = app.state.startup = StartupProfile()
+    with startup.phase("agent"):
+        app.state.helper_agent = HelperAgent()
+    app.state.admission = AdmissionController.from_settings(shared_quota())
+    with startup.phase("data_refresher"):
+        data_refresher = DataRefresher(
+            on_index_published=app.state.helper_agent.reload_retriever
+        )
+        await data_refresher.start()
+
+    # Models load in the background: /health answers right away, /ready
+    # once they are in memory. Warm-up retries until it succeeds, so it
+    # gets its own thread rather than a slot of the retrieval pool
+    stop_warmup = threading.Event()
+    if settings.STARTUP_WARMUP:
+        threading.Thread(
+            target=app.state.helper_agent.warm_up,
+            args=(startup, stop_warmup),
+            name="warmup",
+            daemon=True,
+        ).start()
+    else:
+        startup.finish()
 
     yield
 
     logger.info("FastAPI shutting down...")
+    stop_warmup.set()
     if data_refresher:
         await data_refresher.shutdown()
 
@@ -38,13 +64,45 @@ app.include_router(chat_router)
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "mode": settings.AGENT_MODE}
-
-
-@app.post("/admin/refresh")
+    """Liveness: answers as soon as the server is up, even while warming up."""
+    return {
+        "status": "healthy",
+        "ready": app.state.startup.ready,
+        "mode": settings.AGENT_MODE,
+        "loaded": registry.loaded(),
+        "refresh_leader": bool(data_refresher and data_refresher.leader.held),
+        "admission": app.state.admission.stats(),
+    }
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness: 503 until the warmup has loaded the models (or if it failed)."""
+    startup = app.state.startup
+    if not startup.ready:
+        response.status_code = 503
+    return startup.report()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latencies, tokens, cache and retrieval stats."""
+    body, content_type = render()
+    return Response(body, media_type=content_type)
+
+
+@app.post("/admin/refresh", status_code=202)
 async def manual_refresh():
-    """Manual data refresh endpoint."""
+    """Start a background data refresh (or join the one already running)."""
     if data_refresher:
-        await data_refresher.refresh_all()
-        return {"status": "refresh_completed"}
+        return await data_refresher.refresh_all()
     return {"status": "refresher_not_running"}
+
+
+@app.get("/admin/refresh/{job_id}")
+async def refresh_status(job_id: str):
+    """Phase, progress and timings of a refresh job."""
+    job = data_refresher.jobs.get(job_id) if data_refresher else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown refresh job")
+    return job
@@ -1,4 +1,8 @@
-from app.utils import build_vectorstore, load_docs
+import argparse
+
+from app.index_store import current_shard_dirs, publish_shards
+from app.ingest import sync_shards
+from app.shards import shard_name
 
 DOC_PATHS = [
     "data/langgraph-llms.txt",
@@ -8,6 +12,19 @@ DOC_PATHS = [
 ]
 
 if __name__ == "__main__":
-    docs = load_docs(DOC_PATHS)
-    build_vectorstore(docs)
-    print("Ingestion complete.")
+    parser = argparse.ArgumentParser(description="Build the offline index shards.")
+    parser.add_argument(
+        "--source",
+        action="append",
+        choices=[shard_name(path) for path in DOC_PATHS],
+        help="rebuild only this source's shard (repeatable; default: all)",
+    )
+    args = parser.parse_args()
+
+    base = current_shard_dirs()
+    shards, stats = sync_shards(DOC_PATHS, base, sources=args.source)
+    if shards and shards != base:
+        publish_shards(shards)
+        print(f"Ingestion complete: {stats}")
+    else:
+        print(f"Index unchanged: {stats}")
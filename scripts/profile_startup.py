@@ -0,0 +1,105 @@
+"""Startup-time report: import time per package, then each init phase.
+
+Imports are timed with `python -X importtime` in a fresh interpreter, so
+nothing is already loaded. Init phases (building the agent and warming
+up its default `AGENT_MODE`) then run in this process. Usage:
+
+    python -m scripts.profile_startup                      # API (main)
+    python -m scripts.profile_startup --module app.agent   # Streamlit UI
+    AGENT_MODE=online python -m scripts.profile_startup --json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict
+
+FIRST_PARTY = {"main", "app", "api", "config", "streamlit_app"}
+
+
+def import_times(module: str, top: int) -> Dict[str, Any]:
+    """Seconds to import `module`, by top-level package (self time) and by
+    first-party module (cumulative time)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    first_party: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        package = name.split(".")[0]
+        packages[package] += int(self_us) / 1e6
+        if depth == 0:
+            total += int(cumulative_us) / 1e6
+        if package in FIRST_PARTY:
+            first_party[name] = int(cumulative_us) / 1e6
+
+    def ranked(times: Dict[str, float]) -> Dict[str, float]:
+        best = sorted(times.items(), key=lambda item: -item[1])[:top]
+        return {name: round(seconds, 3) for name, seconds in best}
+
+    return {
+        "module": module,
+        "total_s": round(total, 3),
+        "packages_s": ranked(packages),
+        "first_party_s": ranked(first_party),
+    }
+
+
+def init_phases() -> Dict[str, Any]:
+    """Build the agent and warm it up, timing each phase."""
+    from app.agent import HelperAgent
+    from app.startup import StartupProfile
+
+    profile = StartupProfile()
+    try:
+        with profile.phase("agent"):
+            agent = HelperAgent()
+    except Exception:
+        return profile.report()
+    agent.warm_up(profile, max_attempts=1)
+    return profile.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main", help="entry point to import")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--skip-init", action="store_true", help="imports only")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = {"imports": import_times(args.module, args.top)}
+    if not args.skip_init:
+        report["init"] = init_phases()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    imports = report["imports"]
+    print(f"import {imports['module']}: {imports['total_s']:.2f}s")
+    for title, key in (("by package", "packages_s"), ("first party", "first_party_s")):
+        print(f"\n  {title}:")
+        for name, seconds in imports[key].items():
+            print(f"    {seconds:7.3f}s  {name}")
+    if "init" in report:
+        init = report["init"]
+        print(f"\ninit: {init['status']}")
+        for name, ms in init["phases_ms"].items():
+            print(f"    {ms / 1000:7.3f}s  {name}")
+        for name, error in init.get("errors", {}).items():
+            print(f"  {name} failed: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
-import asyncio
-import os
+import threading
+import uuid
 
 import streamlit as st
 from dotenv import load_dotenv
 
 from app.agent import HelperAgent
+from app.startup import StartupProfile
 from config import settings
 
 load_dotenv()
@@ -21,27 +22,34 @@ if "current_mode" not in st.session_state:
 
 if st.sidebar.button("🔄 Switch Mode", use_container_width=True):
     st.session_state.current_mode = mode
-    st.cache_resource.clear()
     st.rerun()
 
 st.sidebar.info(f"**Mode**: {st.session_state.current_mode}")
 
 
-@st.cache_resource(ttl=300)
-def get_agent(_mode: str) -> HelperAgent:
-    os.environ["AGENT_MODE"] = _mode
+@st.cache_resource
+def get_agent() -> HelperAgent:
+    """One agent per process; the mode is chosen per message.
+
+    Models load in a background thread, so the page renders right away.
+    """
     agent = HelperAgent()
-    st.info(f"✅ Agent loaded in {_mode} mode")
+    if settings.STARTUP_WARMUP:
+        threading.Thread(
+            target=agent.warm_up, args=(StartupProfile(),), daemon=True
+        ).start()
     return agent
 
 
-agent = get_agent(st.session_state.current_mode)
+agent = get_agent()
 
 st.title("🔗 LangGraph Helper Agent")
 st.markdown("**Live mode switching + full conversation history**")
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = uuid.uuid4().hex
 
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -61,44 +69,45 @@ if prompt := st.chat_input("💭 Ask about LangGraph/LangChain..."):
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner(f"🤔 {st.session_state.current_mode.title()} mode..."):
-            try:
-                result = agent.chat(
-                    [{"role": "user", "content": prompt}], thread_id="streamlit"
-                )
-            except AttributeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(
-                    agent.achat([{"role": "user", "content": prompt}], "streamlit")
-                )
-                loop.close()
-
-            st.markdown(result["answer"])
-
-            sources = result.get("sources", [])
-            if sources:
-                with st.expander(f"📚 {len(sources)} sources"):
-                    for i, source in enumerate(sources, 1):
-                        st.markdown(f"**{i}.** `{source.get('source', 'Web')}`")
-                        content = source.get("content", "")
-                        st.markdown(
-                            content[:400] + "..." if len(content) > 400 else content
-                        )
-
-            st.session_state.messages.append(
-                {
-                    "role": "assistant",
-                    "content": result["answer"],
-                    "sources": sources,
-                    "mode": st.session_state.current_mode,
-                }
-            )
+        result = {}
+
+        def answer_tokens():
+            for event, data in agent.stream_chat(
+                [{"role": "user", "content": prompt}],
+                thread_id=st.session_state.thread_id,
+                mode=st.session_state.current_mode,
+            ):
+                if event == "token":
+                    yield data
+                elif event == "done":
+                    result.update(data)
+
+        st.write_stream(answer_tokens())
+
+        sources = result.get("sources", [])
+        if sources:
+            with st.expander(f"📚 {len(sources)} sources"):
+                for i, source in enumerate(sources, 1):
+                    st.markdown(f"**{i}.** `{source.get('source', 'Web')}`")
+                    content = source.get("content", "")
+                    st.markdown(
+                        content[:400] + "..." if len(content) > 400 else content
+                    )
+
+        st.session_state.messages.append(
+            {
+                "role": "assistant",
+                "content": result["answer"],
+                "sources": sources,
+                "mode": st.session_state.current_mode,
+            }
+        )
 
     st.rerun()
 
 if st.sidebar.button("🗑️ Clear Chat", use_container_width=True):
     st.session_state.messages = []
+    st.session_state.thread_id = uuid.uuid4().hex
     st.rerun()
 
 st.sidebar.markdown("---")
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import router
+from app.admission import AdmissionController, QuotaCallback, QuotaTracker
+from app.llm_router import HedgedChatModel
+from benchmarks.fakes import FakeChatModel
+
+
+class FakeAgent:
+    provider = "fake"
+
+    async def astream_chat(self, messages, thread_id, mode):
+        yield "token", {"text": "hi"}
+        yield "done", {"thread_id": thread_id}
+
+    async def abatch_chat(self, requests):
+        for i, _ in enumerate(requests):
+            yield i, {"answer": "hi"}
+
+
+def make_app(max_concurrent: int = 2, quota: QuotaTracker = None) -> FastAPI:
+    app = FastAPI()
+    app.include_router(router)
+    app.state.helper_agent = FakeAgent()
+    app.state.admission = AdmissionController(
+        max_concurrent=max_concurrent,
+        max_queue=0,
+        queue_timeout=1,
+        client_rate=1000,
+        client_burst=1000,
+        quota=quota or QuotaTracker({}, {}, cooldown=1),
+    )
+    return app
+
+
+async def disconnect_before_body(app: FastAPI, path: str, payload: Dict[str, Any]):
+    """Call `app` with a client that is gone before the response starts."""
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    messages: List[Dict[str, Any]] = [
+        {"type": "http.request", "body": body, "more_body": False}
+    ]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise OSError("client disconnected")
+
+    with pytest.raises(OSError):
+        await app(scope, receive, send)
+
+
+CHAT = {"messages": [{"role": "user", "content": "hi"}]}
+
+
+@pytest.mark.parametrize(
+    "path,payload", [("/chat/stream", CHAT), ("/chat/batch", {"requests": [CHAT]})]
+)
+def test_early_disconnect_releases_slot(path, payload):
+    app = make_app(max_concurrent=2)
+    for _ in range(3):
+        asyncio.run(disconnect_before_body(app, path, payload))
+    assert app.state.admission.running == 0
+
+    response = TestClient(app).post(path, json=payload)
+    assert response.status_code == 200
+
+
+def test_finished_stream_releases_slot_once():
+    app = make_app(max_concurrent=1)
+    client = TestClient(app)
+    for _ in range(3):
+        response = client.post("/chat/stream", json=CHAT)
+        assert response.status_code == 200
+        assert "event: done" in response.text
+    assert app.state.admission.running == 0
+
+
+def test_requests_without_llm_calls_do_not_use_quota():
+    quota = QuotaTracker({"fake": 1}, {}, cooldown=1)
+    client = TestClient(make_app(quota=quota))
+    for _ in range(3):
+        assert client.post("/chat/stream", json=CHAT).status_code == 200
+    assert quota.usage().get("fake", {}).get("last_minute", 0) == 0
+
+
+def test_every_provider_call_is_charged():
+    quota = QuotaTracker({}, {}, cooldown=1)
+    model = HedgedChatModel.from_models(
+        {
+            name: FakeChatModel(latency=latency, callbacks=[QuotaCallback(quota, name)])
+            for name, latency in (("primary", 0.3), ("secondary", 0.01))
+        },
+        hedge_delay=0.05,
+    )
+    asyncio.run(model.ainvoke("hi"))
+    asyncio.run(model.ainvoke("hi"))
+    usage = quota.usage()
+    assert usage["primary"]["last_minute"] == 2
+    assert usage["secondary"]["today"] == 2
+    assert quota.wait("primary") == 0
+
+    quota.per_minute["primary"] = 2
+    assert quota.wait("primary") > 0
@@ -0,0 +1,21 @@
+import asyncio
+
+from app.agent import HelperAgent
+from benchmarks.fakes import workspace
+from tests.test_streaming import DATA_PATHS, QUESTION, make_agent
+
+
+def test_index_is_checked_once_per_poll_interval(monkeypatch):
+    reloads = []
+    monkeypatch.setattr(
+        HelperAgent, "reload_retriever", lambda agent: reloads.append(agent)
+    )
+    with workspace(DATA_PATHS):
+        agent = make_agent("offline")
+        for _ in range(3):
+            asyncio.run(agent.achat(QUESTION, None))
+        assert len(reloads) == 1
+
+        agent._index_checked = 0.0
+        asyncio.run(agent.achat(QUESTION, None))
+        assert len(reloads) == 2
@@ -0,0 +1,38 @@
+from app.cache import AnswerCache
+
+EMBEDDING = [1.0, 0.0, 0.0]
+
+
+def cache() -> AnswerCache:
+    answers = AnswerCache(maxsize=8, ttl=60, threshold=0.9)
+    answers.use_version("v1")
+    return answers
+
+
+def test_exact_and_semantic_hits():
+    answers = cache()
+    answers.store("What is a node?", EMBEDDING, "A function.", [], "v1")
+    entry, match, _ = answers.lookup("what is a node", [0.0, 1.0, 0.0])
+    assert (entry["answer"], match) == ("A function.", "exact")
+    _, match, similarity = answers.lookup("Nodes?", [0.99, 0.05, 0.0])
+    assert match == "semantic" and similarity >= 0.9
+    assert answers.lookup("Edges?", [0.0, 1.0, 0.0]) is None
+
+
+def test_new_version_clears_cached_answers():
+    answers = cache()
+    answers.store("What is a node?", EMBEDDING, "A function.", [], "v1")
+    answers.use_version("v1")
+    assert answers.lookup("What is a node?", EMBEDDING)
+    answers.use_version("v2")
+    assert answers.lookup("What is a node?", EMBEDDING) is None
+
+
+def test_answer_from_a_replaced_version_is_not_stored():
+    answers = cache()
+    # Retrieved from v1, then the index moved on before the LLM answered
+    answers.use_version("v2")
+    answers.store("What is a node?", EMBEDDING, "Stale.", [], "v1")
+    assert answers.lookup("What is a node?", EMBEDDING) is None
+    answers.store("What is a node?", EMBEDDING, "Fresh.", [], "v2")
+    assert answers.lookup("What is a node?", EMBEDDING)[0]["answer"] == "Fresh."
@@ -0,0 +1,68 @@
+import shutil
+
+from langchain_core.documents import Document
+
+from app.context import build_context
+from app.dense_index import DenseIndex
+from benchmarks.fakes import REPO_ROOT
+from tests.test_ingest import INSERTED, build
+
+SOURCE = "".join(f"Sentence number {i} of the docs. " for i in range(40))
+
+
+def chunk(start: int, end: int, source: str = "docs.txt") -> Document:
+    text = SOURCE.encode("utf-8")[start:end].decode("utf-8")
+    return Document(
+        page_content=text,
+        metadata={"source": source, "start_byte": start, "end_byte": end},
+    )
+
+
+def test_overlapping_chunks_merge_into_the_source_text():
+    context, stats = build_context([chunk(100, 300), chunk(250, 450)], 10_000)
+    assert context == SOURCE[100:450]
+    assert stats["merged"] == 1
+
+
+def test_touching_chunks_merge_without_a_separator():
+    context, _ = build_context([chunk(0, 200), chunk(200, 400)], 10_000)
+    assert context == SOURCE[:400]
+
+
+def test_chunks_with_a_gap_are_not_spliced():
+    context, stats = build_context([chunk(0, 200), chunk(205, 400)], 10_000)
+    assert SOURCE[:205] not in context
+    assert SOURCE[0:200] in context and SOURCE[205:400] in context
+    assert stats["merged"] == 0
+
+
+def test_chunks_of_other_sources_are_kept_apart():
+    context, _ = build_context([chunk(0, 200), chunk(150, 400, "other.txt")], 10_000)
+    assert SOURCE[:400] not in context
+
+
+def test_chunks_with_mismatched_offsets_are_not_merged():
+    # Offsets that no longer match the text (e.g. from an outdated index)
+    stale = [chunk(0, 300), chunk(100, 300), chunk(300, 500)]
+    stale[1].metadata["start_byte"] = 20
+    context, stats = build_context(stale, 10_000)
+    assert stats["merged"] == 1
+    blocks = context.split("\n\n")
+    assert SOURCE[:300] in blocks
+    assert all(block in SOURCE for block in blocks)
+
+
+def test_context_after_incremental_sync_is_source_text(tmp_path):
+    source = tmp_path / "langgraph-llms.txt"
+    shutil.copy(REPO_ROOT / "data" / "langgraph-llms.txt", source)
+    build(source, tmp_path / "v1")
+    source.write_text(INSERTED + source.read_text(encoding="utf-8"), encoding="utf-8")
+    build(source, tmp_path / "v2", base=tmp_path / "v1")
+
+    dense = DenseIndex.load(tmp_path / "v2")
+    docs = dense.get_by_ids([cid.decode("ascii") for cid in dense.ids])
+    docs.sort(key=lambda doc: doc.metadata["start_byte"])
+    context, _ = build_context(docs[:12], 100_000)
+    text = source.read_text(encoding="utf-8")
+    for block in context.split("\n\n"):
+        assert block in text
@@ -0,0 +1,73 @@
+import asyncio
+from pathlib import Path
+from typing import Callable, List
+
+import httpx
+import pytest
+
+import app.data_refresh as data_refresh
+
+URL = "https://docs.example.com/llms.txt"
+ORIGINAL = b"# Original docs\n"
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """Body that fails after its first block, like a dropped connection."""
+
+    async def __aiter__(self):
+        yield b"# Partial"
+        raise httpx.ReadError("connection reset")
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path, monkeypatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_refresh, "DOWNLOAD_BACKOFF_SECONDS", 0)
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "llms.txt").write_bytes(ORIGINAL)
+    return tmp_path / "data"
+
+
+def fetch(handler: Callable[[httpx.Request], httpx.Response], validators: dict):
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await data_refresh._fetch(client, "llms.txt", URL, validators)
+
+    return asyncio.run(run())
+
+
+def test_not_modified_keeps_file(data_dir: Path):
+    requests: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(304)
+
+    assert fetch(handler, {"etag": '"v1"'}) is None
+    assert requests[0].headers["If-None-Match"] == '"v1"'
+    assert (data_dir / "llms.txt").read_bytes() == ORIGINAL
+
+
+def test_transient_error_is_retried(data_dir: Path):
+    statuses = iter([503, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = next(statuses)
+        if status != 200:
+            return httpx.Response(status)
+        return httpx.Response(200, content=b"# New docs\n", headers={"etag": '"v2"'})
+
+    assert fetch(handler, {})["etag"] == '"v2"'
+    assert (data_dir / "llms.txt").read_bytes() == b"# New docs\n"
+    assert list(data_dir.iterdir()) == [data_dir / "llms.txt"]
+
+
+def test_failed_download_leaves_original_file(data_dir: Path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=BrokenStream())
+
+    with pytest.raises(httpx.ReadError):
+        fetch(handler, {})
+    assert (data_dir / "llms.txt").read_bytes() == ORIGINAL
+    assert list(data_dir.iterdir()) == [data_dir / "llms.txt"]
@@ -0,0 +1,46 @@
+import asyncio
+import time
+from typing import List
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.embedder import BatchingEmbedder
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    calls: List[int] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(len(texts))
+        time.sleep(0.05)
+        return super().embed_documents(texts)
+
+
+def embedder(**kwargs) -> BatchingEmbedder:
+    options = {"window_ms": 20, "max_batch": 8, "cache_size": 0, **kwargs}
+    return BatchingEmbedder(SlowEmbeddings(size=8, calls=[]), **options)
+
+
+def test_concurrent_queries_share_one_batch():
+    model = embedder()
+
+    async def embed_all():
+        return await asyncio.gather(*(model.aembed_query(f"q{i}") for i in range(5)))
+
+    vectors = asyncio.run(embed_all())
+    assert vectors == [model.embeddings.embed_query(f"q{i}") for i in range(5)]
+    assert model.embeddings.calls[0] == 5
+
+
+def test_cancelled_query_does_not_stop_the_dispatcher():
+    model = embedder()
+
+    async def cancel_one():
+        task = asyncio.ensure_future(model.aembed_query("cancelled"))
+        await asyncio.sleep(0.005)
+        task.cancel()
+        await asyncio.sleep(0.1)
+        return await asyncio.wait_for(model.aembed_query("next"), timeout=2)
+
+    assert asyncio.run(cancel_one()) == model.embeddings.embed_query("next")
+    assert model._dispatcher.is_alive()
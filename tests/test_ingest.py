@@ -0,0 +1,41 @@
+import shutil
+from pathlib import Path
+
+from app.dense_index import DenseIndex
+from app.ingest import sync_index
+from app.utils import iter_chunks
+from benchmarks.fakes import REPO_ROOT, fake_embeddings
+
+INSERTED = "# Preface\n\nA paragraph inserted above everything else.\n\n"
+
+
+def build(source: Path, target: Path, base: Path = None):
+    return sync_index(
+        iter_chunks([str(source)]),
+        target,
+        base_dir=base,
+        embeddings=fake_embeddings(),
+        workers=1,
+    )
+
+
+def assert_offsets_match(index_dir: Path, source: Path):
+    raw = source.read_bytes()
+    dense = DenseIndex.load(index_dir)
+    docs = dense.get_by_ids([cid.decode("ascii") for cid in dense.ids])
+    assert docs
+    for doc in docs:
+        start, end = doc.metadata["start_byte"], doc.metadata["end_byte"]
+        assert raw[start:end].decode("utf-8") == doc.page_content
+
+
+def test_incremental_sync_refreshes_offsets_of_unchanged_chunks(tmp_path):
+    source = tmp_path / "langgraph-llms.txt"
+    shutil.copy(REPO_ROOT / "data" / "langgraph-llms.txt", source)
+    build(source, tmp_path / "v1")
+
+    source.write_text(INSERTED + source.read_text(encoding="utf-8"), encoding="utf-8")
+    stats = build(source, tmp_path / "v2", base=tmp_path / "v1")
+
+    assert stats["unchanged"] > 0
+    assert_offsets_match(tmp_path / "v2", source)
@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from app.jobs import RefreshJobManager
+from benchmarks.fakes import scratch_dir
+
+
+def wait_for(manager: RefreshJobManager, job_id: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] != "running":
+            return job
+        time.sleep(0.1)
+    raise TimeoutError(f"Job {job_id} still running after {timeout}s")
+
+
+def start_worker_pool(report: Callable) -> Dict[str, Any]:
+    """What a multi-worker ingest does first: spawn a process pool."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:
+        pid = pool.submit(os.getpid).result()
+    return {"worker_pid": pid != os.getpid()}
+
+
+def work_briefly(report: Callable) -> Dict[str, Any]:
+    report("working", {"done": 0})
+    time.sleep(1)
+    return {"worked": True}
+
+
+def refresh_with_fakes(report: Callable) -> Dict[str, Any]:
+    """`run_refresh` with downloads skipped and fake embeddings."""
+    import app.data_refresh as data_refresh
+    import app.ingest as ingest
+    from benchmarks.fakes import fake_embeddings
+
+    async def no_changes():
+        return []
+
+    data_refresh.download_docs = no_changes
+    ingest.get_embeddings = fake_embeddings
+    ingest.settings.INGEST_WORKERS = 1
+    return data_refresh.run_refresh(report)
+
+
+def test_job_can_start_worker_processes(tmp_path: Path):
+    manager = RefreshJobManager(start_worker_pool, tmp_path / "jobs")
+    job = wait_for(manager, manager.submit()["id"])
+    assert job["status"] == "succeeded", job["error"]
+    assert job["result"] == {"worker_pid": True}
+
+
+def test_refresh_runs_through_job_manager():
+    published = []
+    with scratch_dir() as tmp:
+        manager = RefreshJobManager(
+            refresh_with_fakes, tmp / "jobs", on_success=published.append
+        )
+        job = wait_for(manager, manager.submit()["id"])
+        assert job["status"] == "succeeded", job["error"]
+        assert job["result"]["published"]
+        assert {"chunking", "embedding", "publishing"} <= job["timings"].keys()
+        progress = job["progress"]
+        assert 0 < progress["parsed_bytes"] == progress["total_bytes"]
+        assert (tmp / "vectorstore" / "chroma" / "CURRENT").exists()
+        # The success hook runs on the watcher thread once the child is joined
+        deadline = time.monotonic() + 10
+        while not published and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert published == [job["result"]]
+
+
+def test_duplicate_submit_joins_running_job(tmp_path: Path):
+    manager = RefreshJobManager(start_worker_pool, tmp_path / "jobs")
+    first = manager.submit()
+    second = manager.submit()
+    assert second["id"] == first["id"] and second["deduplicated"]
+    wait_for(manager, first["id"])
+
+
+def test_workers_sharing_state_join_the_same_job(tmp_path: Path):
+    """Managers in different workers see one job through the shared files."""
+
+    def worker() -> RefreshJobManager:
+        return RefreshJobManager(
+            work_briefly, tmp_path / "jobs", lock_path=tmp_path / "refresh.lock"
+        )
+
+    first = worker().submit()
+    # Before the job's process holds the lock, and while it does
+    starting = worker().submit()
+    assert starting["id"] == first["id"] and starting["deduplicated"]
+    deadline = time.monotonic() + 60
+    while worker().get(first["id"])["phase"] != "working":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    locked = worker().submit()
+    assert locked["id"] == first["id"] and locked["deduplicated"]
+
+    job = wait_for(worker(), first["id"])
+    assert job["status"] == "succeeded", job["error"]
+    assert job["result"] == {"worked": True}
+    assert worker().submit()["id"] != first["id"]
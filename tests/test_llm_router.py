@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm_router import CircuitBreaker, HedgedChatModel
+from benchmarks.fakes import FakeChatModel
+
+
+def router(primary: dict, secondary: dict, **kwargs) -> HedgedChatModel:
+    return HedgedChatModel.from_models(
+        {"primary": FakeChatModel(**primary), "secondary": FakeChatModel(**secondary)},
+        **kwargs,
+    )
+
+
+def test_fast_primary_is_not_hedged():
+    model = router({"latency": 0.01}, {"latency": 0.01}, hedge_delay=0.5)
+    assert asyncio.run(model.ainvoke("hi")).content
+    counts = model.stats()["providers"]
+    assert counts["primary"]["win"] == 1
+    assert "hedge" not in counts["secondary"]
+
+
+def test_slow_primary_is_hedged_and_secondary_wins():
+    model = router({"latency": 1.0}, {"latency": 0.01}, hedge_delay=0.05)
+    started = time.perf_counter()
+    asyncio.run(model.ainvoke("hi"))
+    assert time.perf_counter() - started < 0.5
+    counts = model.stats()["providers"]
+    assert counts["secondary"]["hedge"] == 1
+    assert counts["secondary"]["win"] == 1
+
+
+def test_streaming_is_hedged_on_first_token():
+    model = router({"latency": 1.0}, {"latency": 0.01}, hedge_delay=0.05)
+
+    async def stream() -> str:
+        return "".join([chunk.content async for chunk in model.astream("hi")])
+
+    assert asyncio.run(stream()) == FakeChatModel().answer
+    assert model.stats()["providers"]["secondary"]["win"] == 1
+
+
+def test_failing_primary_fails_over():
+    model = router({"latency": 0.01, "failure_rate": 1.0}, {"latency": 0.01})
+    assert asyncio.run(model.ainvoke("hi")).content
+    counts = model.stats()["providers"]
+    assert counts["primary"]["error"] == 1
+    assert counts["secondary"]["failover"] == 1
+
+
+def test_every_provider_failing_raises():
+    failing = {"latency": 0.01, "failure_rate": 1.0}
+    model = router(failing, failing)
+    with pytest.raises(RuntimeError, match="Injected provider failure"):
+        asyncio.run(model.ainvoke("hi"))
+
+
+def test_breaker_skips_provider_until_cooldown():
+    model = router(
+        {"latency": 0.01, "failure_rate": 1.0},
+        {"latency": 0.01},
+        breaker_failures=2,
+        breaker_cooldown=0.2,
+    )
+    for _ in range(4):
+        asyncio.run(model.ainvoke("hi"))
+    counts = model.stats()["providers"]["primary"]
+    assert counts["error"] == 2
+    assert counts["breaker_open"] == 1
+    assert model.stats()["providers"]["primary"]["breaker"] == "open"
+
+    time.sleep(0.25)
+    model.models["primary"] = FakeChatModel(latency=0.01)
+    asyncio.run(model.ainvoke("hi"))
+    assert model.stats()["providers"]["primary"]["breaker"] == "closed"
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+    assert breaker.failure()
+    assert breaker.state == "half_open" and breaker.available()
+    breaker.begin()
+    assert not breaker.available()
+    assert breaker.failure()
+    assert breaker.opened_at is not None
+
+
+def test_cancelled_trial_frees_half_open_breaker():
+    model = router(
+        {"latency": 0.3},
+        {"latency": 1.0},
+        breaker_failures=1,
+        breaker_cooldown=0.0,
+        hedge_delay=0.05,
+    )
+    secondary = model.state.breakers["secondary"]
+    secondary.failure()
+    # The secondary's hedged trial call loses to the primary and is cancelled
+    asyncio.run(model.ainvoke("hi"))
+    assert model.stats()["providers"]["primary"]["win"] == 1
+    assert model.stats()["providers"]["secondary"]["hedge"] == 1
+    assert secondary.available()
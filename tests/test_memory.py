@@ -0,0 +1,30 @@
+import asyncio
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from benchmarks.fakes import workspace
+from tests.test_streaming import DATA_PATHS, QUESTION, make_agent
+
+
+def stored_threads(saver: InMemorySaver) -> set:
+    return {c.config["configurable"]["thread_id"] for c in saver.list(None)}
+
+
+def test_requests_without_thread_are_not_stored():
+    with workspace(DATA_PATHS):
+        agent = make_agent("offline")
+
+        async def run():
+            result = await agent.achat(QUESTION, None)
+            batch = [r async for _, r in agent.abatch_chat([{"messages": QUESTION}])]
+            events = [e async for e in agent.astream_chat(QUESTION, None)]
+            return result, batch, events
+
+        result, batch, events = asyncio.run(run())
+        assert result["answer"] and result["thread_id"] is None
+        assert batch[0]["answer"] and batch[0]["thread_id"] is None
+        assert events[-1][1]["thread_id"] is None
+        assert stored_threads(agent.checkpointer) == set()
+
+        asyncio.run(agent.achat(QUESTION, "kept"))
+        assert stored_threads(agent.checkpointer) == {"kept"}
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import app.agent
+from app.agent import HelperAgent
+from app.startup import StartupProfile
+
+
+class FlakyAgent(HelperAgent):
+    """Only what `warm_up` touches: an LLM that fails `failures` times."""
+
+    def __init__(self, failures: int):
+        self.mode = "online"
+        self.failures = failures
+
+    @property
+    def llm(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("provider unreachable")
+        return object()
+
+    def _get_online_agent(self):
+        return object()
+
+
+def test_warmup_retries_until_ready(monkeypatch):
+    monkeypatch.setattr(app.agent, "WARMUP_BACKOFF_SECONDS", 0.01)
+    profile = StartupProfile()
+    FlakyAgent(failures=2).warm_up(profile)
+    assert profile.ready
+    assert profile.report()["status"] == "ready"
+    assert "warmup:online_agent" in profile.phases
+
+
+def test_warmup_reports_retrying_until_it_recovers(monkeypatch):
+    monkeypatch.setattr(app.agent, "WARMUP_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(app.agent, "WARMUP_MAX_BACKOFF_SECONDS", 0.05)
+    profile = StartupProfile()
+    agent = FlakyAgent(failures=10**6)
+    warmup = threading.Thread(target=agent.warm_up, args=(profile,))
+    warmup.start()
+    time.sleep(0.2)
+    report = profile.report()
+    assert report["status"] == "retrying" and not profile.ready
+
+    agent.failures = 0
+    warmup.join(timeout=5)
+    assert profile.ready and not profile.errors
+
+
+def test_warmup_gives_up_after_max_attempts():
+    profile = StartupProfile()
+    FlakyAgent(failures=1).warm_up(profile, max_attempts=1)
+    assert not profile.ready
+    assert profile.report()["status"] == "failed"
+
+
+def test_stopped_warmup_is_abandoned(monkeypatch):
+    monkeypatch.setattr(app.agent, "WARMUP_BACKOFF_SECONDS", 60)
+    profile = StartupProfile()
+    stop = threading.Event()
+    stop.set()
+    FlakyAgent(failures=1).warm_up(profile, stop)
+    assert profile.finished is None and not profile.ready
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, List, Tuple
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+import app.tools
+from app.agent import HelperAgent
+from app.cache import AnswerCache
+from benchmarks.fakes import (
+    FakeChatModel,
+    FakeSearchClient,
+    fake_embeddings,
+    workspace,
+)
+
+DATA_PATHS = ["data/langgraph-llms.txt"]
+QUESTION = [{"role": "user", "content": "How do I add a checkpointer?"}]
+
+
+def stream(agent: HelperAgent, mode: str) -> List[Tuple[str, Any]]:
+    async def collect():
+        return [e async for e in agent.astream_chat(QUESTION, "t", mode)]
+
+    return asyncio.run(collect())
+
+
+def make_agent(mode: str, **llm: Any) -> HelperAgent:
+    agent = HelperAgent(
+        llm=FakeChatModel(latency=0.01, **llm),
+        embeddings=fake_embeddings(),
+        mode=mode,
+        checkpointer=InMemorySaver(),
+    )
+    agent.answer_cache = AnswerCache(maxsize=0, ttl=0, threshold=1)
+    return agent
+
+
+def assert_streamed(events: List[Tuple[str, Any]]):
+    tokens = [data for event, data in events if event == "token"]
+    done = events[-1]
+    assert done[0] == "done"
+    assert len(tokens) > 1
+    assert "".join(tokens) == done[1]["answer"] == FakeChatModel().answer
+
+
+def test_online_answer_streams_token_by_token(monkeypatch):
+    monkeypatch.setattr(app.tools, "_search_client", FakeSearchClient(latency=0))
+    events = stream(make_agent("online"), "online")
+    assert events[0][0] == "sources"
+    assert_streamed(events)
+
+
+def test_offline_answer_streams_token_by_token():
+    with workspace(DATA_PATHS):
+        events = stream(make_agent("offline"), "offline")
+    assert events[0][0] == "sources" and events[0][1]
+    assert_streamed(events)
+
+
+def test_online_narration_before_tool_call_is_not_streamed(monkeypatch):
+    monkeypatch.setattr(app.tools, "_search_client", FakeSearchClient(latency=0))
+    agent = make_agent("online", narration="Let me search the docs first.")
+    events = stream(agent, "online")
+    assert_streamed(events)
+    assert not any("search" in data for event, data in events if event == "token")
@@ -0,0 +1,15 @@
+import threading
+
+from app.tools import TavilySearchClient
+
+
+def test_each_thread_has_its_own_session_on_one_pool():
+    client = TavilySearchClient(api_key="key")
+    sessions = [client.session]
+    thread = threading.Thread(target=lambda: sessions.append(client.session))
+    thread.start()
+    thread.join()
+    assert client.session is sessions[0]
+    assert sessions[1] is not sessions[0]
+    adapters = {session.get_adapter("https://api.tavily.com") for session in sessions}
+    assert adapters == {client._adapter}
@@ -0,0 +1,20 @@
+import pytest
+
+import app.utils
+from app.utils import splitter_fingerprint
+
+
+@pytest.mark.parametrize(
+    "setting,value",
+    [
+        ("CHUNK_SIZE", 500),
+        ("CHUNK_OVERLAP", 50),
+        ("SECTION_TARGET_CHARS", 2_000),
+        ("SECTION_MAX_CHARS", 8_000),
+        ("EMBEDDING_MODEL", "other-model"),
+    ],
+)
+def test_chunking_settings_change_the_fingerprint(monkeypatch, setting, value):
+    before = splitter_fingerprint()
+    monkeypatch.setattr(app.utils, setting, value)
+    assert splitter_fingerprint() != before